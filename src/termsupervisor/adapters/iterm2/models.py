@@ -3,7 +3,7 @@
 布局相关的 DTO：Window, Tab, Pane, Layout。
 """
 
-from dataclasses import asdict, dataclass, field
+from dataclasses import dataclass, field
 
 
 @dataclass
@@ -18,6 +18,18 @@ class PaneInfo:
     width: float
     height: float
 
+    def to_dict(self) -> dict:
+        """转换为字典"""
+        return {
+            "pane_id": self.pane_id,
+            "name": self.name,
+            "index": self.index,
+            "x": self.x,
+            "y": self.y,
+            "width": self.width,
+            "height": self.height,
+        }
+
 
 @dataclass
 class TabInfo:
@@ -27,6 +39,14 @@ class TabInfo:
     name: str
     panes: list[PaneInfo] = field(default_factory=list)
 
+    def to_dict(self) -> dict:
+        """转换为字典"""
+        return {
+            "tab_id": self.tab_id,
+            "name": self.name,
+            "panes": [pane.to_dict() for pane in self.panes],
+        }
+
 
 @dataclass
 class WindowInfo:
@@ -40,6 +60,18 @@ class WindowInfo:
     height: float
     tabs: list[TabInfo] = field(default_factory=list)
 
+    def to_dict(self) -> dict:
+        """转换为字典"""
+        return {
+            "window_id": self.window_id,
+            "name": self.name,
+            "x": self.x,
+            "y": self.y,
+            "width": self.width,
+            "height": self.height,
+            "tabs": [tab.to_dict() for tab in self.tabs],
+        }
+
 
 @dataclass
 class LayoutData:
@@ -50,5 +82,9 @@ class LayoutData:
     active_pane_id: str | None = None  # renamed from active_session_id
 
     def to_dict(self) -> dict:
-        """转换为字典"""
-        return asdict(self)
+        """转换为字典（逐字段构建，避免 asdict 的递归深拷贝）"""
+        return {
+            "windows": [window.to_dict() for window in self.windows],
+            "updated_panes": list(self.updated_panes),
+            "active_pane_id": self.active_pane_id,
+        }
@@ -59,6 +59,10 @@ class ContentCleaner:
         Returns:
             清洗后的行（只包含文字）
         """
+        # 0. 快速路径：整行没有任何白名单字符（空行、分隔线等）直接返回
+        #    ANSI 序列本身只会引入额外的白名单字符，因此在移除前检查是安全的
+        if not any(cls.is_allowed_char(c) for c in line):
+            return ""
         # 1. 移除 ANSI 转义序列
         line = cls._ANSI_PATTERN.sub("", line)
         # 2. 白名单过滤（只保留文字）
@@ -31,11 +31,14 @@ USER_NAME_VAR = "user.name"  # 用户自定义名称变量名
 # === Actor 队列配置 ===
 QUEUE_MAX_SIZE = 256  # 队列最大长度
 QUEUE_HIGH_WATERMARK = 0.75  # 高水位阈值（打印 debug 日志）
-PROTECTED_SIGNALS = {
-    "shell.command_end",
-    "claude-code.Stop",
-    "claude-code.SessionEnd",
-}  # 不可丢弃信号
+QUEUE_YIELD_BATCH_SIZE = 64  # 单批处理超过该数量时，取下一批前让出事件循环
+PROTECTED_SIGNALS = frozenset(
+    {
+        "shell.command_end",
+        "claude-code.Stop",
+        "claude-code.SessionEnd",
+    }
+)  # 不可丢弃信号
 
 # === 状态机配置 ===
 STATE_HISTORY_MAX_LENGTH = 30  # 内存中历史记录最大长度
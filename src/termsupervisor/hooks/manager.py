@@ -14,8 +14,8 @@ Sources 通过 emit_event 发送事件，Manager 负责：
 """
 
 import logging
-from collections.abc import Awaitable, Callable
-from datetime import datetime
+import time
+from collections.abc import Awaitable, Callable, Iterable
 
 from ..config import METRICS_ENABLED
 from ..core.ids import short_id
@@ -62,19 +62,20 @@ class HookManager:
 
     # === 配置 ===
 
-    def set_change_callback(self, callback: StatusChangeCallback) -> None:
+    def set_change_callback(self, callback: StatusChangeCallback | None) -> None:
         """设置状态变更回调
 
         Args:
-            callback: 回调函数 (pane_id, status, description, source) -> None
+            callback: 回调函数 (pane_id, status, description, source) -> None，
+                None 表示取消
         """
         self._on_change = callback
 
-    def set_debug_event_callback(self, callback: DebugEventCallback) -> None:
+    def set_debug_event_callback(self, callback: DebugEventCallback | None) -> None:
         """设置调试事件回调
 
         Args:
-            callback: 回调函数 (event_dict) -> None
+            callback: 回调函数 (event_dict) -> None，传 None 取消
                 event_dict 包含: pane_id, signal, result, reason, state_id
         """
         self._state_manager.set_on_debug_event(callback)
@@ -108,7 +109,7 @@ class HookManager:
             event_type=event_type,
             signal=f"{source}.{event_type}",
             data=data or {},
-            timestamp=datetime.now().timestamp(),
+            timestamp=time.time(),
             pane_generation=generation,
         )
 
@@ -315,7 +316,7 @@ class HookManager:
         """移除 pane"""
         self._state_manager.remove_pane(pane_id)
 
-    def cleanup_closed_panes(self, active_pane_ids: set[str]) -> list[str]:
+    def cleanup_closed_panes(self, active_pane_ids: Iterable[str]) -> list[str]:
         """清理已关闭的 pane"""
         return self._state_manager.cleanup_closed_panes(active_pane_ids)
 
@@ -325,8 +326,7 @@ class HookManager:
 
     def clear_all(self) -> None:
         """清除所有状态"""
-        for pane_id in list(self._state_manager.get_all_panes()):
-            self.remove_pane(pane_id)
+        self._state_manager.clear_all()
 
     # === 持久化 (TODO: implement in StateManager) ===
 
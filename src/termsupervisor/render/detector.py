@@ -52,7 +52,6 @@ class ChangeDetector:
         Returns:
             是否需要刷新
         """
-        now = datetime.now()
         last_content = self._last_render_content.get(pane_id, "")
         last_time = self._last_render_time.get(pane_id)
 
@@ -60,6 +59,10 @@ class ChangeDetector:
         if pane_id not in self._last_render_content:
             return True
 
+        # 快速路径：内容完全相同，无需 diff
+        if cleaned_content == last_content:
+            return False
+
         # 计算变化行数
         try:
             changed_lines, _ = ContentCleaner.diff_lines(last_content, cleaned_content)
@@ -77,9 +80,9 @@ class ChangeDetector:
         if changed_lines >= threshold:
             return True
 
-        # 兜底: 有变化且超时
+        # 兜底: 有变化且超时（只有走到这里才读时钟，相同内容/大变化的常见路径不读）
         if last_time:
-            elapsed = (now - last_time).total_seconds()
+            elapsed = (datetime.now() - last_time).total_seconds()
             if elapsed >= self._flush_timeout:
                 return True
 
@@ -140,8 +140,14 @@ class RenderPipeline:
                         is_waiting = status_info is not None and status_info.get("status") == "waiting_approval"
 
                     # Clean content and compute hash
-                    cleaned_content = ContentCleaner.clean_content_str(content)
-                    content_hash = ContentCleaner.content_hash(cleaned_content)
+                    # (reuse the cached result when raw content is unchanged)
+                    cached = self._cache.get_pane_state(pane_id)
+                    if cached is not None and cached.current.content == content:
+                        cleaned_content = cached.current.cleaned_content
+                        content_hash = cached.current.content_hash
+                    else:
+                        cleaned_content = ContentCleaner.clean_content_str(content)
+                        content_hash = ContentCleaner.content_hash(cleaned_content)
 
                     # Check if refresh needed
                     should_refresh = self._detector.should_refresh(
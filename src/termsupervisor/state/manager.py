@@ -7,15 +7,30 @@
 - 清理过期 pane
 """
 
-from collections.abc import Callable
+import asyncio
+import time
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
 from typing import Any
 
-from ..config import QUIET_COMPLETION_THRESHOLD_SECONDS
+from ..config import (
+    METRICS_ENABLED,
+    QUEUE_YIELD_BATCH_SIZE,
+    QUIET_COMPLETION_THRESHOLD_SECONDS,
+)
 from ..core.ids import normalize_id, short_id
-from ..telemetry import get_logger
+from ..telemetry import get_logger, metrics
 from .queue import EventQueue
 from .state_machine import PaneStateMachine
-from .types import DisplayState, DisplayUpdate, HookEvent, StateChange, TaskStatus
+from .types import (
+    FINISHED_STATUSES,
+    Clock,
+    DisplayState,
+    DisplayUpdate,
+    HookEvent,
+    StateChange,
+    TaskStatus,
+)
 
 logger = get_logger(__name__)
 
@@ -24,26 +39,57 @@ OnDisplayChangeCallback = Callable[[str, DisplayState], Any]
 OnDebugEventCallback = Callable[[dict], Any]
 
 
+def _noop_display_change(pane_id: str, state: DisplayState) -> None:
+    """默认显示变化回调（无操作），省去每次通知时的判空分支"""
+    return None
+
+
+@dataclass(slots=True)
+class _PaneEntry:
+    """单个 pane 的运行时对象（同生同灭，一次字典查找全部取到）"""
+
+    machine: PaneStateMachine
+    queue: EventQueue
+    display_state: DisplayState
+
+
 class StateManager:
     """状态管理器
 
     统一管理状态机和显示逻辑。
 
     Attributes:
-        machines: 状态机字典 {pane_id: PaneStateMachine}
-        queues: 事件队列字典 {pane_id: EventQueue}
+        entries: pane 字典 {pane_id: _PaneEntry(machine, queue, display_state)}
     """
 
-    def __init__(self):
-        """初始化"""
-        self._machines: dict[str, PaneStateMachine] = {}
-        self._queues: dict[str, EventQueue] = {}
+    def __init__(
+        self,
+        clock: Clock = time.monotonic,
+        batch_callbacks: bool = False,
+        coalesce_updates: bool = True,
+    ):
+        """初始化
 
-        # 显示状态存储
-        self._display_states: dict[str, DisplayState] = {}
+        Args:
+            clock: 时间源，传递给每个 PaneStateMachine（测试可注入）
+            batch_callbacks: 合并同一事件循环 tick 内的显示变化回调，
+                每个 pane 只回调最新的 DisplayState
+            coalesce_updates: process_queued 每个 pane 只返回最新的 DisplayUpdate；
+                False 时按事件逐个返回并回调（回调在事件处理后立即触发）
+
+        显示变化回调与 process_queued 的返回值同源：每个返回的 DisplayUpdate
+        对应一次回调（批量模式下再跨调用合并），不会按事件单独通知。
+        """
+        self._clock = clock
+        self._batch_callbacks = batch_callbacks
+        self._coalesce_updates = coalesce_updates
+        # 批量模式下待回调的显示状态 {pane_id: DisplayState}
+        self._pending_display_changes: dict[str, DisplayState] = {}
+        # 每个 pane 的状态机、事件队列、显示状态
+        self._entries: dict[str, _PaneEntry] = {}
 
         # 回调
-        self._on_display_change: OnDisplayChangeCallback | None = None
+        self._on_display_change: OnDisplayChangeCallback = _noop_display_change
         self._on_debug_event: OnDebugEventCallback | None = None
 
         # pane generation 跟踪
@@ -51,22 +97,22 @@ class StateManager:
 
     # === 配置 ===
 
-    def set_on_display_change(self, callback: OnDisplayChangeCallback) -> None:
-        """设置显示变化回调"""
-        self._on_display_change = callback
+    def set_on_display_change(self, callback: OnDisplayChangeCallback | None) -> None:
+        """设置显示变化回调（None 表示取消）"""
+        self._on_display_change = callback or _noop_display_change
 
-    def set_on_debug_event(self, callback: OnDebugEventCallback) -> None:
+    def set_on_debug_event(self, callback: OnDebugEventCallback | None) -> None:
         """设置调试事件回调
 
         Args:
-            callback: 回调函数 (event_dict) -> None
+            callback: 回调函数 (event_dict) -> None，None 表示取消
                 event_dict 包含: pane_id, signal, result, reason, state_id,
                 以及队列统计: queue_depth, queue_overflow_drops
         """
         self._on_debug_event = callback
         # 同步到已有的队列
-        for queue in self._queues.values():
-            queue.set_on_debug_event(callback)
+        for entry in self._entries.values():
+            entry.queue.set_on_debug_event(callback)
 
     # === 实例管理 ===
 
@@ -79,14 +125,17 @@ class StateManager:
         Returns:
             (machine, display_state) 元组
         """
-        normalized_id = normalize_id(pane_id)
-
-        if normalized_id not in self._machines:
-            self._create_pane(normalized_id)
+        entry = self._get_or_create_entry(normalize_id(pane_id))
+        return entry.machine, entry.display_state
 
-        return self._machines[normalized_id], self._display_states[normalized_id]
+    def _get_or_create_entry(self, pane_id: str) -> _PaneEntry:
+        """获取或创建 pane 条目（pane_id 已规范化）"""
+        entry = self._entries.get(pane_id)
+        if entry is None:
+            entry = self._create_pane(pane_id)
+        return entry
 
-    def _create_pane(self, pane_id: str) -> None:
+    def _create_pane(self, pane_id: str) -> _PaneEntry:
         """创建新的 pane 实例"""
         # 初始化 generation
         self._pane_generations[pane_id] = 1
@@ -95,10 +144,11 @@ class StateManager:
         machine = PaneStateMachine(
             pane_id=pane_id,
             pane_generation=self._pane_generations[pane_id],
+            clock=self._clock,
         )
 
         # 初始化显示状态
-        self._display_states[pane_id] = DisplayState(
+        display_state = DisplayState(
             status=TaskStatus.IDLE,
             source="shell",
             description="",
@@ -112,17 +162,31 @@ class StateManager:
         if self._on_debug_event:
             queue.set_on_debug_event(self._on_debug_event)
 
-        self._machines[pane_id] = machine
-        self._queues[pane_id] = queue
+        entry = _PaneEntry(machine=machine, queue=queue, display_state=display_state)
+        self._entries[pane_id] = entry
 
         logger.debug(f"[StateManager] Created pane: {short_id(pane_id)}")
+        return entry
 
     def _notify_display_change(self, pane_id: str, state: DisplayState) -> None:
-        """通知显示变化"""
-        if not self._on_display_change:
+        """通知显示变化
+
+        批量模式下只记录最新状态，在下一个事件循环 tick 统一回调。
+        """
+        if not self._batch_callbacks:
+            self._on_display_change(pane_id, state)
             return
 
-        self._on_display_change(pane_id, state)
+        if not self._pending_display_changes:
+            asyncio.get_running_loop().call_soon(self._flush_display_changes)
+        self._pending_display_changes[pane_id] = state
+
+    def _flush_display_changes(self) -> None:
+        """批量回调待处理的显示变化"""
+        pending = self._pending_display_changes
+        self._pending_display_changes = {}
+        for pane_id, state in pending.items():
+            self._on_display_change(pane_id, state)
 
     def _emit_debug_event(
         self,
@@ -131,6 +195,7 @@ class StateManager:
         result: str,
         reason: str = "",
         state_id: int = 0,
+        pending: int = 0,
     ) -> None:
         """发送调试事件
 
@@ -140,17 +205,18 @@ class StateManager:
             result: 结果 ("ok" or "fail")
             reason: 失败原因（可选）
             state_id: 当前 state_id
+            pending: 已从队列取出但尚未处理的事件数（计入 queue_depth）
         """
         if not self._on_debug_event:
             return
 
         # 获取队列统计
-        queue = self._queues.get(pane_id)
-        queue_depth = 0
+        entry = self._entries.get(pane_id)
+        queue_depth = pending
         queue_overflow_drops = 0
-        if queue:
-            queue_depth = queue.depth
-            queue_overflow_drops = queue.overflow_drops
+        if entry is not None:
+            queue_depth += entry.queue.depth
+            queue_overflow_drops = entry.queue.overflow_drops
 
         self._on_debug_event(
             {
@@ -178,15 +244,14 @@ class StateManager:
         pane_id = normalize_id(event.pane_id)
 
         # 确保 pane 存在
-        self.get_or_create(pane_id)
+        entry = self._get_or_create_entry(pane_id)
 
         # 补全 generation（如果缺失）
         if event.pane_generation == 0:
             event.pane_generation = self._pane_generations.get(pane_id, 1)
 
         # 入队
-        queue = self._queues[pane_id]
-        return queue.enqueue_event(event)
+        return entry.queue.enqueue_event(event)
 
     async def process_queued(
         self, pane_id: str | None = None
@@ -199,62 +264,89 @@ class StateManager:
         Returns:
             (count, updates) 元组：
             - count: 处理的事件数
-            - updates: DisplayUpdate 列表（仅状态变化事件，不含 content 事件）
+            - updates: DisplayUpdate 列表（仅状态变化事件，不含 content 事件；
+              默认每个 pane 最多一个，DisplayState 为实时对象，多次变化只需通知一次；
+              coalesce_updates=False 时每个状态变化事件一个）
         """
         if pane_id:
             pane_ids = [normalize_id(pane_id)]
         else:
-            pane_ids = list(self._queues.keys())
+            pane_ids = list(self._entries.keys())
 
         total = 0
         updates: list[DisplayUpdate] = []
 
         for pid in pane_ids:
-            queue = self._queues.get(pid)
-            if not queue or queue.is_processing:
+            entry = self._entries.get(pid)
+            if entry is None or entry.queue.is_processing:
                 continue
+            queue = entry.queue
 
+            latest: DisplayUpdate | None = None
             queue.set_processing(True)
             try:
-                while not queue.is_empty:
-                    event = queue.dequeue()
-                    if event:
-                        update = await self._process_event(pid, event)
-                        total += 1
-                        if update:
-                            updates.append(update)
+                # 批量取出后同步处理；处理期间（回调中）新入队的事件由下一轮取出
+                while batch := queue.drain():
+                    pending = len(batch)
+                    try:
+                        for event in batch:
+                            pending -= 1
+                            update = self._process_event(pid, entry, event, pending)
+                            if update is None:
+                                continue
+                            if self._coalesce_updates:
+                                latest = update
+                            else:
+                                updates.append(update)
+                                self._notify_display_change(pid, update.display_state)
+                    finally:
+                        # 中途异常时未处理的事件放回队首，下次 process_queued 继续处理
+                        if pending:
+                            queue.requeue_front(batch[-pending:])
+                    total += len(batch)
+                    # 大批量处理后让出事件循环，避免长时间占用
+                    if len(batch) > QUEUE_YIELD_BATCH_SIZE:
+                        await asyncio.sleep(0)
             finally:
                 queue.set_processing(False)
 
+            if latest is not None:
+                updates.append(latest)
+                self._notify_display_change(pid, latest.display_state)
+
         return total, updates
 
-    async def _process_event(self, pane_id: str, event: HookEvent) -> DisplayUpdate | None:
+    def _process_event(
+        self, pane_id: str, entry: _PaneEntry, event: HookEvent, pending: int = 0
+    ) -> DisplayUpdate | None:
         """处理单个事件
 
         Args:
             pane_id: pane 标识
+            entry: pane 条目
             event: Hook 事件
+            pending: 同一批次中排在该事件之后、尚未处理的事件数
 
         Returns:
             DisplayUpdate 如果发生状态变化，None 如果无变化
         """
-        machine = self._machines.get(pane_id)
-        if not machine:
-            return None
-
+        machine = entry.machine
         change = machine.process(event)
 
         if change:
             # 更新显示状态
-            display_state = self._update_display_state(pane_id, change)
+            display_state = self._update_display_state(pane_id, change, entry)
 
             # 更新队列的 state_id
-            queue = self._queues.get(pane_id)
-            if queue:
-                queue.set_current_state_id(machine.state_id)
+            entry.queue.set_current_state_id(machine.state_id)
 
             # 发送调试事件
-            self._emit_debug_event(pane_id, event.signal, "ok", state_id=machine.state_id)
+            self._emit_debug_event(
+                pane_id, event.signal, "ok", state_id=machine.state_id, pending=pending
+            )
+
+            if display_state is None:
+                return None
 
             return DisplayUpdate(
                 pane_id=pane_id,
@@ -262,76 +354,91 @@ class StateManager:
                 reason="state_change",
             )
         else:
-            # 获取失败原因
-            reason = self._get_last_fail_reason(machine)
-            self._emit_debug_event(
-                pane_id, event.signal, "fail", reason=reason, state_id=machine.state_id
-            )
+            # 失败原因只用于调试事件：无订阅者时不读取历史
+            if self._on_debug_event:
+                reason = self._get_last_fail_reason(machine)
+                self._emit_debug_event(
+                    pane_id,
+                    event.signal,
+                    "fail",
+                    reason=reason,
+                    state_id=machine.state_id,
+                    pending=pending,
+                )
             return None
 
-    def _update_display_state(self, pane_id: str, change: StateChange) -> DisplayState:
+    def _update_display_state(
+        self, pane_id: str, change: StateChange, entry: _PaneEntry | None = None
+    ) -> DisplayState | None:
         """更新显示状态 (Phase 3.4)
 
         Args:
             pane_id: pane 标识
             change: 状态变化
+            entry: pane 条目（调用方已持有时传入，省去一次查找）
 
         Returns:
-            更新后的 DisplayState
+            原地更新后的 DisplayState；pane 不存在或 change 比当前显示状态旧时返回 None
         """
-        # 计算 quiet_completion（短任务不闪烁）
-        quiet_completion = False
-        if change.new_status in {TaskStatus.DONE, TaskStatus.FAILED}:
-            if change.running_duration < QUIET_COMPLETION_THRESHOLD_SECONDS:
-                quiet_completion = True
+        if entry is None:
+            entry = self._entries.get(pane_id)
+            if entry is None:
+                return None
+
+        # 过期检查放在最前面：旧 state_id 不修改 DisplayState
+        current = entry.display_state
+        if change.state_id < current.state_id:
+            logger.debug(
+                f"[StateManager] Dropped stale display update: {short_id(pane_id)} "
+                f"state_id {change.state_id} < {current.state_id}"
+            )
+            if METRICS_ENABLED:
+                metrics.inc("display.stale_dropped", {"pane": short_id(pane_id)})
+            return None
 
-        display_state = DisplayState(
-            status=change.new_status,
-            source=change.new_source,
-            description=change.description,
-            state_id=change.state_id,
-            started_at=change.started_at,
-            running_duration=change.running_duration,
-            recently_finished=False,
-            quiet_completion=quiet_completion,
+        # 计算 quiet_completion（短任务不闪烁）
+        quiet_completion = (
+            change.new_status in FINISHED_STATUSES
+            and change.running_duration < QUIET_COMPLETION_THRESHOLD_SECONDS
         )
-        self._display_states[pane_id] = display_state
-        return display_state
+
+        # 原地更新（每个 pane 只有一个 DisplayState 实例）
+        current.apply(change, quiet_completion)
+        return current
 
     def _get_last_fail_reason(self, machine: PaneStateMachine) -> str:
         """从状态机历史获取最后一次失败原因"""
-        history = machine.history
-        if history:
-            last_entry = history[-1]
-            if not last_entry.success:
-                return last_entry.description
+        last_entry = machine.last_history_entry
+        if last_entry is not None and not last_entry.success:
+            return last_entry.description
         return ""
 
     # === 状态查询 ===
 
     def get_status(self, pane_id: str) -> TaskStatus:
         """获取 pane 状态"""
-        pane_id = normalize_id(pane_id)
-        machine = self._machines.get(pane_id)
-        return machine.status if machine else TaskStatus.IDLE
+        entry = self._entries.get(normalize_id(pane_id))
+        return entry.machine.status if entry is not None else TaskStatus.IDLE
 
     def get_machine(self, pane_id: str) -> PaneStateMachine | None:
         """获取状态机"""
-        return self._machines.get(normalize_id(pane_id))
+        entry = self._entries.get(normalize_id(pane_id))
+        return entry.machine if entry is not None else None
 
     def get_display_state(self, pane_id: str) -> DisplayState | None:
         """获取显示状态"""
-        return self._display_states.get(normalize_id(pane_id))
+        entry = self._entries.get(normalize_id(pane_id))
+        return entry.display_state if entry is not None else None
 
     def get_all_panes(self) -> set[str]:
         """获取所有 pane_id"""
-        return set(self._machines.keys())
+        return set(self._entries.keys())
 
     def get_all_states(self) -> dict[str, dict]:
         """获取所有状态（用于 WebSocket）"""
         result = {}
-        for pane_id, display_state in self._display_states.items():
-            result[pane_id] = display_state.to_dict()
+        for pane_id, entry in self._entries.items():
+            result[pane_id] = entry.display_state.to_dict()
         return result
 
     def get_generation(self, pane_id: str) -> int:
@@ -343,13 +450,10 @@ class StateManager:
         pane_id = normalize_id(pane_id)
         self._pane_generations[pane_id] = self._pane_generations.get(pane_id, 0) + 1
 
-        machine = self._machines.get(pane_id)
-        if machine is not None:
-            machine.increment_generation()
-
-        queue = self._queues.get(pane_id)
-        if queue is not None:
-            queue.set_current_generation(self._pane_generations[pane_id])
+        entry = self._entries.get(pane_id)
+        if entry is not None:
+            entry.machine.increment_generation()
+            entry.queue.set_current_generation(self._pane_generations[pane_id])
 
         return self._pane_generations[pane_id]
 
@@ -362,13 +466,10 @@ class StateManager:
     ) -> dict | None:
         """获取指定 pane 的调试快照"""
         pane_id = normalize_id(pane_id)
-        machine = self._machines.get(pane_id)
-        display_state = self._display_states.get(pane_id)
-        queue = self._queues.get(pane_id)
-
-        # 注意：用 is None 而不是 not，因为 EventQueue.__bool__ 在队列为空时返回 False
-        if machine is None or display_state is None or queue is None:
+        entry = self._entries.get(pane_id)
+        if entry is None:
             return None
+        machine, display_state, queue = entry.machine, entry.display_state, entry.queue
 
         history_entries = machine.history
         if max_history is not None:
@@ -379,14 +480,15 @@ class StateManager:
             "machine": {
                 "status": machine.status.value,
                 "source": machine.source,
-                "started_at": machine.started_at,
+                # started_at 来自单调时钟，对外只给出已运行秒数
+                "running_duration": machine.get_running_duration(),
                 "state_id": machine.state_id,
                 "pane_generation": machine.pane_generation,
                 "description": machine.description,
             },
             "display": display_state.to_dict(),
             "queue": queue.debug_snapshot(max_pending=max_pending_events),
-            "history": [entry.to_dict() for entry in history_entries],
+            "history": [item.to_dict() for item in history_entries],
         }
 
     def get_all_debug_snapshots(
@@ -408,7 +510,7 @@ class StateManager:
             - total: 总 pane 数（分页前）
         """
         snapshots = []
-        all_pane_ids = sorted(self._machines.keys())
+        all_pane_ids = sorted(self._entries.keys())
         total = len(all_pane_ids)
 
         # 应用分页
@@ -419,23 +521,14 @@ class StateManager:
             pane_ids = pane_ids[:limit]
 
         for pane_id in pane_ids:
-            machine = self._machines.get(pane_id)
-            display_state = self._display_states.get(pane_id)
-            queue = self._queues.get(pane_id)
-
-            # 注意：用 is None 而不是 not，因为 EventQueue.__bool__ 在队列为空时返回 False
-            if machine is None or display_state is None or queue is None:
-                continue
+            entry = self._entries[pane_id]
+            machine, display_state, queue = entry.machine, entry.display_state, entry.queue
 
             display = display_state.to_dict()
             queue_info = queue.debug_snapshot(max_pending=0)
-            history = machine.history
-
             # 获取最近一条历史
-            latest_history = None
-            if history:
-                entry = history[-1]
-                latest_history = entry.to_dict()
+            last_entry = machine.last_history_entry
+            latest_history = last_entry.to_dict() if last_entry is not None else None
 
             snapshots.append(
                 {
@@ -459,14 +552,20 @@ class StateManager:
         """移除 pane"""
         pane_id = normalize_id(pane_id)
 
-        self._machines.pop(pane_id, None)
-        self._queues.pop(pane_id, None)
+        self._entries.pop(pane_id, None)
         self._pane_generations.pop(pane_id, None)
-        self._display_states.pop(pane_id, None)
+        # 批量模式下尚未回调的显示变化随 pane 一起丢弃
+        self._pending_display_changes.pop(pane_id, None)
 
         logger.debug(f"[StateManager] Removed pane: {short_id(pane_id)}")
 
-    def cleanup_closed_panes(self, active_pane_ids: set[str]) -> list[str]:
+    def clear_all(self) -> None:
+        """移除所有 pane（包括未回调的批量显示变化），回调保持不变"""
+        self._entries.clear()
+        self._pane_generations.clear()
+        self._pending_display_changes.clear()
+
+    def cleanup_closed_panes(self, active_pane_ids: Iterable[str]) -> list[str]:
         """清理已关闭的 pane
 
         Args:
@@ -476,10 +575,10 @@ class StateManager:
             被清理的 pane_id 列表
         """
         normalized_active = {normalize_id(pid) for pid in active_pane_ids}
-        current_panes = set(self._machines.keys())
 
-        closed = current_panes - normalized_active
+        # 单次遍历，按创建顺序返回，不生成中间集合
+        closed = [pid for pid in self._entries if pid not in normalized_active]
         for pane_id in closed:
             self.remove_pane(pane_id)
 
-        return list(closed)
+        return closed
@@ -47,8 +47,13 @@ class ActorQueue[T]:
         high_watermark: float = QUEUE_HIGH_WATERMARK,
     ):
         self.pane_id = pane_id
+        # 日志前缀和指标标签每次入队/出队都会用到，构造时计算一次
+        self._pane_short = short_id(pane_id)
+        self._metric_labels = {"pane": self._pane_short}
         self._max_size = max_size
         self._high_watermark = high_watermark
+        # 高水位告警的深度阈值，避免每次入队做浮点乘法
+        self._high_watermark_depth = max_size * high_watermark
         self._queue: deque[T] = deque(maxlen=max_size)
         self._processing = False
 
@@ -63,24 +68,24 @@ class ActorQueue[T]:
         Returns:
             是否成功入队（总是 True，但可能丢弃了旧事件）
         """
-        pane_short = short_id(self.pane_id)
+        pane_short = self._pane_short
 
         # 检查是否需要丢弃
         if len(self._queue) >= self._max_size:
             self._queue.popleft()
             logger.warning(f"[Queue:{pane_short}] Dropped oldest event (queue full)")
             if METRICS_ENABLED:
-                metrics.inc("queue.dropped", {"pane": pane_short})
+                metrics.inc("queue.dropped", self._metric_labels)
 
         self._queue.append(item)
 
         # 更新 depth 指标
         depth = len(self._queue)
         if METRICS_ENABLED:
-            metrics.gauge("queue.depth", depth, {"pane": pane_short})
+            metrics.gauge("queue.depth", depth, self._metric_labels)
 
         # 高水位告警
-        if depth >= self._max_size * self._high_watermark:
+        if depth >= self._high_watermark_depth:
             logger.debug(
                 f"[Queue:{pane_short}] High watermark: {depth}/{self._max_size} "
                 f"({depth / self._max_size * 100:.0f}%)"
@@ -101,11 +106,45 @@ class ActorQueue[T]:
 
         # 更新 depth 指标
         if METRICS_ENABLED:
-            pane_short = short_id(self.pane_id)
-            metrics.gauge("queue.depth", len(self._queue), {"pane": pane_short})
+            metrics.gauge("queue.depth", len(self._queue), self._metric_labels)
 
         return item
 
+    def drain(self) -> list[T]:
+        """一次性取出全部项（按入队顺序）
+
+        批量消费时替代逐个 dequeue，depth 指标只更新一次。
+
+        Returns:
+            队列中的全部项，队列空时返回空列表
+        """
+        if not self._queue:
+            return []
+
+        items = list(self._queue)
+        self._queue.clear()
+
+        if METRICS_ENABLED:
+            metrics.gauge("queue.depth", 0, self._metric_labels)
+
+        return items
+
+    def requeue_front(self, items: list[T]) -> None:
+        """把已取出但未处理的项放回队首（保持原顺序）
+
+        用于批量处理中途异常时归还剩余项。超出容量时与 enqueue 一致，丢弃最旧的项。
+
+        Args:
+            items: 按原顺序排列的待归还项
+        """
+        if not items:
+            return
+
+        self._queue = deque([*items, *self._queue], maxlen=self._max_size)
+
+        if METRICS_ENABLED:
+            metrics.gauge("queue.depth", len(self._queue), self._metric_labels)
+
     def peek(self) -> T | None:
         """查看队首（不移除）
 
@@ -126,8 +165,7 @@ class ActorQueue[T]:
         self._queue.clear()
 
         if METRICS_ENABLED:
-            pane_short = short_id(self.pane_id)
-            metrics.gauge("queue.depth", 0, {"pane": pane_short})
+            metrics.gauge("queue.depth", 0, self._metric_labels)
 
         return count
 
@@ -232,7 +270,7 @@ class EventQueue(ActorQueue[HookEvent]):
         Returns:
             是否入队成功（过期或被丢弃的事件返回 False）
         """
-        pane_short = short_id(self.pane_id)
+        pane_short = self._pane_short
 
         # 检查 generation
         if event.pane_generation < self._current_generation:
@@ -241,7 +279,7 @@ class EventQueue(ActorQueue[HookEvent]):
                 f"generation {event.pane_generation} < {self._current_generation}"
             )
             if METRICS_ENABLED:
-                metrics.inc("queue.stale_dropped", {"pane": pane_short})
+                metrics.inc("queue.stale_dropped", self._metric_labels)
             # 发送调试事件
             self._emit_debug_event(event.signal, "drop_stale_generation")
             return False
@@ -256,7 +294,7 @@ class EventQueue(ActorQueue[HookEvent]):
                     f"rejecting new event: {event.signal}"
                 )
                 if METRICS_ENABLED:
-                    metrics.inc("queue.overflow_rejected", {"pane": pane_short})
+                    metrics.inc("queue.overflow_rejected", self._metric_labels)
                 return False
 
         # 直接添加到队列（绕过 ActorQueue.enqueue 的无保护丢弃）
@@ -265,10 +303,10 @@ class EventQueue(ActorQueue[HookEvent]):
         # 更新 depth 指标
         depth = len(self._queue)
         if METRICS_ENABLED:
-            metrics.gauge("queue.depth", depth, {"pane": pane_short})
+            metrics.gauge("queue.depth", depth, self._metric_labels)
 
         # 高水位告警
-        if depth >= self._max_size * self._high_watermark:
+        if depth >= self._high_watermark_depth:
             logger.debug(
                 f"[Queue:{pane_short}] High watermark: {depth}/{self._max_size} "
                 f"({depth / self._max_size * 100:.0f}%)"
@@ -286,7 +324,7 @@ class EventQueue(ActorQueue[HookEvent]):
         Returns:
             被丢弃的事件，如果全是保护事件则返回 None
         """
-        pane_short = short_id(self.pane_id)
+        pane_short = self._pane_short
 
         # 找最旧的非保护事件
         for i, evt in enumerate(self._queue):
@@ -296,7 +334,7 @@ class EventQueue(ActorQueue[HookEvent]):
                 self._overflow_drops += 1
                 logger.debug(f"[Queue:{pane_short}] Overflow: dropped {dropped.signal}")
                 if METRICS_ENABLED:
-                    metrics.inc("queue.overflow_dropped", {"pane": pane_short})
+                    metrics.inc("queue.overflow_dropped", self._metric_labels)
                 # 发送调试事件
                 self._emit_debug_event(dropped.signal, "drop_overflow")
                 return dropped
@@ -7,14 +7,15 @@
 """
 
 import itertools
+import time
 from collections import deque
-from datetime import datetime
 
-from ..config import STATE_HISTORY_MAX_LENGTH
+from ..config import METRICS_ENABLED, STATE_HISTORY_MAX_LENGTH
 from ..core.ids import short_id
 from ..telemetry import get_logger, metrics
 from .transitions import find_matching_rules
 from .types import (
+    Clock,
     HookEvent,
     StateChange,
     StateHistoryEntry,
@@ -42,12 +43,28 @@ class PaneStateMachine:
         pane_id: pane 标识
         status: 当前状态
         source: 状态来源
-        started_at: RUNNING 开始时间（用于计算运行时长）
+        started_at: RUNNING 开始时间（clock 时间，仅用于计算运行时长）
         state_id: 状态唯一 ID（每次成功流转自增）
         history: 状态变化历史（环形队列）
         pane_generation: pane 代次
+        clock: 时间源（默认单调时钟，不受系统时间跳变影响，测试可注入）
     """
 
+    # 每个 pane 一个实例，使用 __slots__ 去掉实例 __dict__
+    __slots__ = (
+        "pane_id",
+        "_short_id",
+        "_metric_labels",
+        "_clock",
+        "_status",
+        "_source",
+        "_started_at",
+        "_state_id",
+        "_pane_generation",
+        "_description",
+        "_history",
+    )
+
     def __init__(
         self,
         pane_id: str,
@@ -56,8 +73,12 @@ class PaneStateMachine:
         started_at: float | None = None,
         state_id: int | None = None,
         pane_generation: int = 1,
+        clock: Clock = time.monotonic,
     ):
         self.pane_id = pane_id
+        self._short_id = short_id(pane_id)  # 日志/指标标签用，构造时计算一次
+        self._metric_labels = {"pane": self._short_id}
+        self._clock = clock
         self._status = status
         self._source = source
         self._started_at = started_at
@@ -70,6 +91,10 @@ class PaneStateMachine:
 
     # === 属性 ===
 
+    @property
+    def short_id(self) -> str:
+        return self._short_id
+
     @property
     def status(self) -> TaskStatus:
         return self._status
@@ -98,6 +123,11 @@ class PaneStateMachine:
     def history(self) -> list[StateHistoryEntry]:
         return list(self._history)
 
+    @property
+    def last_history_entry(self) -> StateHistoryEntry | None:
+        """最近一条历史（不复制整个历史）"""
+        return self._history[-1] if self._history else None
+
     # === 核心方法 ===
 
     def process(self, event: HookEvent) -> StateChange | None:
@@ -112,7 +142,7 @@ class PaneStateMachine:
             StateChange 对象（发生转换时），或 None（无转换）
         """
         signal = event.signal
-        pane_short = short_id(self.pane_id)
+        pane_short = self._short_id
 
         # 1. 检查 generation（拒绝旧事件）
         if event.pane_generation < self._pane_generation:
@@ -120,7 +150,8 @@ class PaneStateMachine:
                 f"[SM:{pane_short}] Rejected stale event: "
                 f"generation {event.pane_generation} < {self._pane_generation}"
             )
-            metrics.inc("transition.stale_generation", {"pane": pane_short})
+            if METRICS_ENABLED:
+                metrics.inc("transition.stale_generation", self._metric_labels)
             self._add_history(
                 signal,
                 self._status,
@@ -145,13 +176,14 @@ class PaneStateMachine:
             return None
 
         # 3. 构建状态快照
+        now = self._clock()
         snapshot = StateSnapshot(
             status=self._status,
             source=self._source,
             state_id=self._state_id,
             started_at=self._started_at,
             pane_generation=self._pane_generation,
-            now=datetime.now().timestamp(),
+            now=now,
         )
 
         # 4. 检查每个规则的谓词，找到第一个满足的
@@ -170,7 +202,8 @@ class PaneStateMachine:
                 success=False,
                 description="predicate_failed",
             )
-            metrics.inc("transition.predicate_fail", {"pane": pane_short})
+            if METRICS_ENABLED:
+                metrics.inc("transition.predicate_fail", self._metric_labels)
             return None
 
         # 5. 执行状态转换
@@ -189,14 +222,14 @@ class PaneStateMachine:
 
         new_started_at: float | None
         if should_reset_started_at:
-            new_started_at = datetime.now().timestamp()
+            new_started_at = now
         else:
             new_started_at = old_started_at
 
         # 计算运行时长（在更新 started_at 之前）
         running_duration = 0.0
-        if old_started_at:
-            running_duration = datetime.now().timestamp() - old_started_at
+        if old_started_at is not None:
+            running_duration = now - old_started_at
 
         # 更新状态
         self._status = new_status
@@ -208,8 +241,9 @@ class PaneStateMachine:
         # 记录历史
         self._add_history(signal, old_status, new_status, success=True, description=new_description)
 
-        # 记录指标
-        metrics.inc("transition.ok", {"pane": pane_short})
+        # 记录指标（受 METRICS_ENABLED 控制）
+        if METRICS_ENABLED:
+            metrics.inc("transition.ok", self._metric_labels)
 
         logger.info(
             f"[SM:{pane_short}] {old_status.value} → {new_status.value} | "
@@ -273,7 +307,7 @@ class PaneStateMachine:
         """获取运行时长（秒）"""
         if self._started_at is None:
             return 0.0
-        return datetime.now().timestamp() - self._started_at
+        return self._clock() - self._started_at
 
     def is_running(self) -> bool:
         """是否在运行中"""
@@ -287,4 +321,15 @@ class PaneStateMachine:
             state_id=self._state_id,
             started_at=self._started_at,
             pane_generation=self._pane_generation,
+            now=self._clock(),
         )
+
+    def reset(self) -> None:
+        """原地恢复为初始状态（IDLE、generation=1、清空历史），分配新的 state_id"""
+        self._status = TaskStatus.IDLE
+        self._source = "shell"
+        self._description = ""
+        self._started_at = None
+        self._state_id = _next_state_id()
+        self._pane_generation = 1
+        self._history.clear()
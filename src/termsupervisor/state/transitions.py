@@ -16,11 +16,13 @@
 | U2 | DONE|FAILED | * | iterm.focus / tmux.focus / frontend.click_pane | IDLE | user |
 """
 
+import sys
+
 from .predicates import (
     require_exit_code,
     require_exit_code_nonzero,
 )
-from .types import TaskStatus, TransitionRule
+from .types import TaskStatus, TransitionRule, register_known_signals
 
 
 # === Shell 规则 ===
@@ -210,6 +212,27 @@ TRANSITION_RULES: list[TransitionRule] = [
 ]
 
 
+def _index_rules(
+    rules: list[TransitionRule],
+) -> dict[tuple[str, TaskStatus], tuple[TransitionRule, ...]]:
+    """按 (signal, 当前状态) 分组规则，组内保持原优先级顺序
+
+    from_status 条件在建表时展开，查找时只需再检查 from_source。
+    signal 经 sys.intern 驻留，与 HookEvent 驻留后的已知 signal 比较时命中指针相等快速路径。
+    """
+    index: dict[tuple[str, TaskStatus], list[TransitionRule]] = {}
+    for rule in rules:
+        for status in TaskStatus:
+            if rule.matches_from_status(status):
+                index.setdefault((sys.intern(rule.signal_pattern), status), []).append(rule)
+    return {key: tuple(group) for key, group in index.items()}
+
+
+# (signal, 当前状态) -> 规则索引：每个事件只需一次字典查找，无需扫描整张规则表
+_RULES_INDEX = _index_rules(TRANSITION_RULES)
+register_known_signals(rule.signal_pattern for rule in TRANSITION_RULES)
+
+
 def find_matching_rules(
     signal: str,
     current_status: TaskStatus,
@@ -227,13 +250,8 @@ def find_matching_rules(
     Returns:
         匹配的规则列表
     """
-    result = []
-    for rule in TRANSITION_RULES:
-        if not rule.matches_signal(signal):
-            continue
-        if not rule.matches_from_status(current_status):
-            continue
-        if not rule.matches_from_source(current_source, signal.split(".")[0]):
-            continue
-        result.append(rule)
-    return result
+    candidates = _RULES_INDEX.get((signal, current_status))
+    if not candidates:
+        return []
+    event_source = signal.partition(".")[0]
+    return [rule for rule in candidates if rule.matches_from_source(current_source, event_source)]
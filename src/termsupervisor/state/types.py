@@ -10,17 +10,32 @@
 """
 
 import logging
+import operator
 import re
-from collections.abc import Callable
+import sys
+import time
+from collections.abc import Callable, Iterable
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
-from typing import TypedDict
+from typing import TypedDict, cast
 
 from ..core.ids import short_id
 
 logger = logging.getLogger(__name__)
 
+# 已知信号词汇表（由规则表注册）：字符串 -> 驻留后的同值字符串
+_KNOWN_STRINGS: dict[str, str] = {}
+
+
+def register_known_signals(signals: Iterable[str]) -> None:
+    """登记已知信号及其 source / event_type，HookEvent 只驻留这些字符串"""
+    for signal in signals:
+        source, _, event_type = signal.partition(".")
+        for value in (signal, source, event_type):
+            value = sys.intern(value)
+            _KNOWN_STRINGS[value] = value
+
 
 class TaskStatus(Enum):
     """任务状态枚举
@@ -42,42 +57,44 @@ class TaskStatus(Enum):
     @property
     def needs_notification(self) -> bool:
         """是否需要通知用户"""
-        return self in {
-            TaskStatus.WAITING_APPROVAL,
-            TaskStatus.DONE,
-            TaskStatus.FAILED,
-        }
+        return self in _NOTIFY_STATUSES
 
     @property
     def needs_attention(self) -> bool:
         """是否需要用户关注（边框闪烁 + 状态闪烁）"""
-        return self in {
-            TaskStatus.WAITING_APPROVAL,
-            TaskStatus.DONE,
-            TaskStatus.FAILED,
-        }
+        return self in _NOTIFY_STATUSES
 
     @property
     def is_running(self) -> bool:
         """是否为运行中状态（边框转圈）"""
-        return self == TaskStatus.RUNNING
+        return self is TaskStatus.RUNNING
 
     @property
     def color(self) -> str:
         """状态对应的颜色"""
-        colors = {
-            TaskStatus.IDLE: "gray",
-            TaskStatus.RUNNING: "blue",
-            TaskStatus.WAITING_APPROVAL: "yellow",
-            TaskStatus.DONE: "green",
-            TaskStatus.FAILED: "red",
-        }
-        return colors.get(self, "gray")
+        return _STATUS_COLORS.get(self, "gray")
 
     @property
     def display(self) -> bool:
         """是否需要前端显示"""
-        return self != TaskStatus.IDLE
+        return self is not TaskStatus.IDLE
+
+
+# TaskStatus 属性查询用的模块级常量（Enum 类体内的普通属性会变成成员，故放在类外），
+# 避免每次访问属性都重新构造集合/字典
+_NOTIFY_STATUSES: frozenset[TaskStatus] = frozenset(
+    {TaskStatus.WAITING_APPROVAL, TaskStatus.DONE, TaskStatus.FAILED}
+)
+_STATUS_COLORS: dict[TaskStatus, str] = {
+    TaskStatus.IDLE: "gray",
+    TaskStatus.RUNNING: "blue",
+    TaskStatus.WAITING_APPROVAL: "yellow",
+    TaskStatus.DONE: "green",
+    TaskStatus.FAILED: "red",
+}
+
+# 已结束状态（DONE / FAILED），模块级常量避免每次判断都构造集合
+FINISHED_STATUSES: frozenset[TaskStatus] = frozenset({TaskStatus.DONE, TaskStatus.FAILED})
 
 
 # TypedDict definitions for dict structures
@@ -139,12 +156,13 @@ class StateHistoryEntryDict(TypedDict):
     timestamp: float
 
 
-@dataclass
+@dataclass(slots=True)
 class HookEvent:
     """Hook 事件 - 统一事件 DTO
 
     所有 Signal Source 产生的事件都转换为此格式。
     由 HookManager 入口统一构造/补全。
+    使用 __slots__（每个事件一个实例）；pane_generation 入队时可能补全，因此不冻结。
 
     Attributes:
         source: 来源标识 (shell, claude-code, content, iterm, frontend)
@@ -165,10 +183,15 @@ class HookEvent:
     pane_generation: int = 0  # 由 HookManager 补全
 
     def __post_init__(self):
-        if not self.signal:
-            self.signal = f"{self.source}.{self.event_type}"
+        # 只把已知词汇换成驻留字符串（规则索引/保护信号查找命中指针比较）；
+        # event_type 来自外部请求，未知值不驻留，避免驻留表无界增长
+        known = _KNOWN_STRINGS
+        self.source = known.get(self.source, self.source)
+        self.event_type = known.get(self.event_type, self.event_type)
+        signal = self.signal or f"{self.source}.{self.event_type}"
+        self.signal = known.get(signal, signal)
         if self.timestamp == 0.0:
-            self.timestamp = datetime.now().timestamp()
+            self.timestamp = time.time()
 
     def format_log(self) -> str:
         """格式化为日志字符串"""
@@ -177,7 +200,7 @@ class HookEvent:
         return f"[HookEvent] {ts} | {self.source:12} | {pane_short:8} | {self.event_type}"
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class StateHistoryEntry:
     """状态变化历史条目
 
@@ -189,7 +212,7 @@ class StateHistoryEntry:
     to_status: TaskStatus  # 新状态
     success: bool = True  # 是否成功转换
     description: str = ""  # 状态描述
-    timestamp: float = field(default_factory=lambda: datetime.now().timestamp())
+    timestamp: float = field(default_factory=time.time)  # 墙钟时间，仅用于展示
 
     def __str__(self) -> str:
         ts = datetime.fromtimestamp(self.timestamp).strftime("%H:%M:%S")
@@ -208,7 +231,7 @@ class StateHistoryEntry:
         )
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class StateChange:
     """状态变更记录
 
@@ -221,7 +244,7 @@ class StateChange:
         new_source: 新来源
         description: 状态描述
         state_id: 状态唯一 ID（自增）
-        started_at: 运行开始时间
+        started_at: 运行开始时间（单调时钟，非墙钟时间）
         running_duration: 运行时长（秒）
     """
 
@@ -235,11 +258,39 @@ class StateChange:
     running_duration: float = 0.0
 
 
-@dataclass
+# DisplayState.to_dict 中由 status 派生的字段，每个状态预先计算一次
+_STATUS_DICT_FIELDS: dict[TaskStatus, dict[str, str | bool]] = {
+    status: {
+        "status": status.value,
+        "status_color": status.color,
+        "is_running": status.is_running,
+        "needs_notification": status.needs_notification,
+        "needs_attention": status.needs_attention,
+        "display": status.display,
+    }
+    for status in TaskStatus
+}
+
+# DisplayState.to_dict 中直接取自实例属性的字段
+_DISPLAY_STATE_FIELDS = (
+    "source",
+    "description",
+    "state_id",
+    "running_duration",
+    "recently_finished",
+    "quiet_completion",
+)
+_get_display_state_fields = operator.attrgetter(*_DISPLAY_STATE_FIELDS)
+
+
+@dataclass(slots=True)
 class DisplayState:
     """显示状态
 
     Pane 维护的显示层数据，用于 WebSocket 广播。
+    每个 pane 只有一个实例，状态变化时通过 apply() 原地更新。
+    to_dict() 结果会被缓存，任何字段赋值（包括 apply() 之外的直接赋值）
+    都会在 __setattr__ 中使缓存失效。
     """
 
     status: TaskStatus
@@ -250,26 +301,45 @@ class DisplayState:
     running_duration: float = 0.0
     recently_finished: bool = False  # 最近完成提示（auto-dismiss 后短暂显示）
     quiet_completion: bool = False  # 静默完成（短任务不闪烁）
+    _dict_cache: DisplayStateDict | None = field(
+        default=None, init=False, repr=False, compare=False
+    )
 
     def to_dict(self) -> DisplayStateDict:
-        """转换为字典（用于 WebSocket）"""
-        return DisplayStateDict(
-            status=self.status.value,
-            status_color=self.status.color,
-            source=self.source,
-            description=self.description,
-            state_id=self.state_id,
-            is_running=self.status.is_running,
-            needs_notification=self.status.needs_notification,
-            needs_attention=self.status.needs_attention,
-            display=self.status.display,
-            running_duration=self.running_duration,
-            recently_finished=self.recently_finished,
-            quiet_completion=self.quiet_completion,
-        )
-
+        """转换为字典（用于 WebSocket）
 
-@dataclass
+        结果在首次调用时构建并缓存，调用方不应修改返回的字典。
+        """
+        if self._dict_cache is None:
+            self._dict_cache = self._build_dict()
+        return self._dict_cache
+
+    def __setattr__(self, name: str, value: object) -> None:
+        object.__setattr__(self, name, value)
+        if name != "_dict_cache":
+            object.__setattr__(self, "_dict_cache", None)
+
+    def apply(self, change: StateChange, quiet_completion: bool) -> None:
+        """按状态变化原地更新字段，并使 to_dict 缓存失效"""
+        # 批量写入绕过 __setattr__，最后统一清除一次缓存
+        set_field = object.__setattr__
+        set_field(self, "status", change.new_status)
+        set_field(self, "source", change.new_source)
+        set_field(self, "description", change.description)
+        set_field(self, "state_id", change.state_id)
+        set_field(self, "started_at", change.started_at)
+        set_field(self, "running_duration", change.running_duration)
+        set_field(self, "recently_finished", False)
+        set_field(self, "quiet_completion", quiet_completion)
+        set_field(self, "_dict_cache", None)
+
+    def _build_dict(self) -> DisplayStateDict:
+        d: dict = dict(_STATUS_DICT_FIELDS[self.status])
+        d.update(zip(_DISPLAY_STATE_FIELDS, _get_display_state_fields(self), strict=True))
+        return cast(DisplayStateDict, d)
+
+
+@dataclass(slots=True, frozen=True)
 class DisplayUpdate:
     """显示更新 - StateManager 处理事件后的返回值
 
@@ -278,7 +348,7 @@ class DisplayUpdate:
 
     Attributes:
         pane_id: pane 标识
-        display_state: 显示状态数据
+        display_state: 显示状态数据（pane 的实时 DisplayState）
         reason: 更新原因（用于调试）
     """
 
@@ -308,12 +378,18 @@ class StateSnapshot:
     state_id: int
     started_at: float | None
     pane_generation: int
-    now: float = field(default_factory=lambda: datetime.now().timestamp())
+    now: float = field(default_factory=time.monotonic)
 
 
 # 谓词函数类型
 Predicate = Callable[[HookEvent, StateSnapshot], bool]
 
+# 时间源类型（返回秒数），默认 time.monotonic，测试可注入假时钟
+Clock = Callable[[], float]
+
+# 描述模板占位符：{key} 或 {key:长度}，模块加载时编译一次
+_PLACEHOLDER_PATTERN = re.compile(r"\{(\w+)(?::(\d+))?\}")
+
 
 @dataclass
 class TransitionRule:
@@ -377,20 +453,21 @@ class TransitionRule:
         Returns:
             格式化后的描述
         """
+        template = self.description_template
+        # 快速路径：无占位符的模板（大多数规则）无需格式化
+        if "{" not in template:
+            return template if len(template) <= max_length else template[: max_length - 3] + "..."
+
+        def _substitute(match: re.Match[str]) -> str:
+            key, length = match.group(1), match.group(2)
+            if key not in data:
+                return match.group(0)
+            value = str(data[key])
+            return value[: int(length)] if length else value
+
         try:
-            # 支持 {key:length} 格式
-            result = self.description_template
-            for key, value in data.items():
-                # 处理 {key:30} 格式
-                pattern = rf"\{{{key}:(\d+)\}}"
-                match = re.search(pattern, result)
-                if match:
-                    length = int(match.group(1))
-                    truncated = str(value)[:length]
-                    # Use lambda to avoid backslash interpretation in replacement
-                    result = re.sub(pattern, lambda m: truncated, result)
-                else:
-                    result = result.replace(f"{{{key}}}", str(value))
+            # 单次扫描模板，支持 {key} 和 {key:length} 格式
+            result = _PLACEHOLDER_PATTERN.sub(_substitute, template)
 
             # 整体截断
             if len(result) > max_length:
@@ -399,7 +476,7 @@ class TransitionRule:
             return result
         except Exception as e:
             logger.debug(f"Failed to format description template: {e}")
-            return self.description_template[:max_length]
+            return template[:max_length]
 
     def get_target_source(self, current_source: str) -> str:
         """获取目标来源"""
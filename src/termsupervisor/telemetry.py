@@ -7,6 +7,11 @@
 """
 
 import logging
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+# 排序后的标签元组，如 (("event_type", "Stop"), ("source", "claude-code"))
+LabelKey = tuple[tuple[str, str], ...]
 
 
 def get_logger(name: str) -> logging.Logger:
@@ -22,6 +27,26 @@ def get_logger(name: str) -> logging.Logger:
     return logger
 
 
+class MetricsScope:
+    """指标写入作用域
+
+    记录作用域内被写入的 key 及其写入前的值，rollback 时只恢复这些 key，
+    开销与写入量成正比，而不是与指标总量成正比。
+    """
+
+    def __init__(self, metrics: "Metrics"):
+        self._metrics = metrics
+        # key → 作用域开始前的值（None 表示原本不存在）
+        self._counters: dict[str, int | None] = {}
+        self._gauges: dict[str, float | None] = {}
+
+    def rollback(self) -> None:
+        """恢复作用域内写入过的指标"""
+        self._metrics._rollback(self)
+        self._counters.clear()
+        self._gauges.clear()
+
+
 class Metrics:
     """指标收集 facade
 
@@ -32,6 +57,10 @@ class Metrics:
     def __init__(self):
         self._counters: dict[str, int] = {}
         self._gauges: dict[str, float] = {}
+        # 计数器 key → (指标名, 排序后的标签元组)，仅在首次创建 key 时写入
+        self._counter_labels: dict[str, tuple[str, LabelKey]] = {}
+        # 当前写入作用域（见 scoped()）
+        self._scope: MetricsScope | None = None
 
     def inc(self, name: str, labels: dict[str, str] | None = None, value: int = 1) -> None:
         """递增计数器
@@ -42,7 +71,13 @@ class Metrics:
             value: 递增值，默认 1
         """
         key = self._make_key(name, labels)
-        self._counters[key] = self._counters.get(key, 0) + value
+        count = self._counters.get(key)
+        if self._scope is not None:
+            self._scope._counters.setdefault(key, count)
+        if count is None:
+            count = 0
+            self._counter_labels[key] = (name, tuple(sorted(labels.items())) if labels else ())
+        self._counters[key] = count + value
 
     def gauge(self, name: str, value: float, labels: dict[str, str] | None = None) -> None:
         """设置 gauge 值
@@ -53,6 +88,8 @@ class Metrics:
             labels: 可选标签
         """
         key = self._make_key(name, labels)
+        if self._scope is not None:
+            self._scope._gauges.setdefault(key, self._gauges.get(key))
         self._gauges[key] = value
 
     def get_counter(self, name: str, labels: dict[str, str] | None = None) -> int:
@@ -65,10 +102,65 @@ class Metrics:
         key = self._make_key(name, labels)
         return self._gauges.get(key, 0.0)
 
+    def snapshot(self, name: str) -> dict[LabelKey, int]:
+        """批量获取同名计数器（用于测试/调试）
+
+        Args:
+            name: 指标名（如 "hooks.events_total"）
+
+        Returns:
+            {排序后的标签元组: 计数值}，
+            如 {(("event_type", "Stop"), ("source", "claude-code")): 1}
+        """
+        return {
+            label_key: self._counters[key]
+            for key, (metric_name, label_key) in self._counter_labels.items()
+            if metric_name == name
+        }
+
     def reset(self) -> None:
         """重置所有指标（用于测试）"""
         self._counters.clear()
         self._gauges.clear()
+        self._counter_labels.clear()
+
+    @contextmanager
+    def scoped(self) -> Iterator[MetricsScope]:
+        """记录作用域内写入的指标（用于测试）
+
+        用法:
+            with metrics.scoped() as scope:
+                ...
+                scope.rollback()
+
+        嵌套时，内层记录在退出时合并到外层，外层 rollback 仍可完整恢复。
+        """
+        outer = self._scope
+        scope = MetricsScope(self)
+        self._scope = scope
+        try:
+            yield scope
+        finally:
+            self._scope = outer
+            if outer is not None:
+                for key, old in scope._counters.items():
+                    outer._counters.setdefault(key, old)
+                for key, old in scope._gauges.items():
+                    outer._gauges.setdefault(key, old)
+
+    def _rollback(self, scope: MetricsScope) -> None:
+        """恢复 scope 记录的指标值"""
+        for key, old_count in scope._counters.items():
+            if old_count is None:
+                self._counters.pop(key, None)
+                self._counter_labels.pop(key, None)
+            else:
+                self._counters[key] = old_count
+        for key, old_gauge in scope._gauges.items():
+            if old_gauge is None:
+                self._gauges.pop(key, None)
+            else:
+                self._gauges[key] = old_gauge
 
     def _make_key(self, name: str, labels: dict[str, str] | None) -> str:
         """生成指标 key"""
@@ -33,7 +33,7 @@ class WebServer:
         self.pipeline = pipeline
         self.adapter = adapter
         self.iterm_client = iterm_client  # Optional, for iTerm2-specific features
-        self.clients: list[WebSocket] = []
+        self.clients: set[WebSocket] = set()
         self._hook_receiver: HookReceiver | None = None
         self._renderer = TerminalRenderer()
         # Debug subscribers (WebSocket clients that want debug events)
@@ -59,8 +59,18 @@ class WebServer:
         receiver.setup_routes(self.app)
         # 将 HookManager 传给 MessageHandler，用于处理用户点击事件
         self._handler.hook_manager = receiver.hook_manager
-        # 设置调试事件回调
-        receiver.hook_manager.set_debug_event_callback(self._on_debug_event)
+        # 调试事件回调在有订阅者时才注册
+        self._sync_debug_callback()
+
+    def _sync_debug_callback(self) -> None:
+        """按订阅者有无注册/注销调试事件回调
+
+        无订阅者时不注册，StateManager 即可跳过调试事件的构造。
+        """
+        if self._hook_receiver is None:
+            return
+        callback = self._on_debug_event if self._debug_subscribers else None
+        self._hook_receiver.hook_manager.set_debug_event_callback(callback)
 
     def _on_debug_event(self, event: dict) -> None:
         """调试事件回调（从 StateManager 接收）
@@ -69,6 +79,8 @@ class WebServer:
         """
         import asyncio
 
+        if not self._debug_subscribers:
+            return
         try:
             loop = asyncio.get_running_loop()
             loop.create_task(self.broadcast_debug_event(event))
@@ -228,7 +240,7 @@ class WebServer:
         @self.app.websocket("/ws")
         async def websocket_endpoint(websocket: WebSocket):
             await websocket.accept()
-            self.clients.append(websocket)
+            self.clients.add(websocket)
             try:
                 await websocket.send_json(self.pipeline.get_layout_dict())
                 while True:
@@ -236,9 +248,8 @@ class WebServer:
                     await self._handler.handle(websocket, data)
             except WebSocketDisconnect:
                 # Safe removal to avoid race with broadcast cleanup
-                if websocket in self.clients:
-                    self.clients.remove(websocket)
-                self._debug_subscribers.discard(websocket)
+                self.clients.discard(websocket)
+                self._discard_debug_subscriber(websocket)
 
     async def broadcast(self, data: dict):
         """广播消息给所有客户端"""
@@ -251,9 +262,8 @@ class WebServer:
                 disconnected.append(client)
         # Remove disconnected clients (safe removal to avoid race with disconnect handler)
         for client in disconnected:
-            if client in self.clients:
-                self.clients.remove(client)
-            self._debug_subscribers.discard(client)
+            self.clients.discard(client)
+            self._discard_debug_subscriber(client)
 
     async def broadcast_debug_event(self, event: dict):
         """广播调试事件给订阅者"""
@@ -266,18 +276,29 @@ class WebServer:
                 await client.send_json(debug_msg)
             except Exception as e:
                 logger.debug(f"Failed to send debug event to client: {e}")
-                self._debug_subscribers.discard(client)
+                self._discard_debug_subscriber(client)
 
     def subscribe_debug(self, websocket: WebSocket) -> bool:
         """订阅调试事件"""
+        first = not self._debug_subscribers
         self._debug_subscribers.add(websocket)
+        if first:
+            self._sync_debug_callback()
         return True
 
     def unsubscribe_debug(self, websocket: WebSocket) -> bool:
         """取消订阅调试事件"""
-        self._debug_subscribers.discard(websocket)
+        self._discard_debug_subscriber(websocket)
         return True
 
+    def _discard_debug_subscriber(self, websocket: WebSocket) -> None:
+        """移除调试订阅者，最后一个离开时注销回调"""
+        if websocket not in self._debug_subscribers:
+            return
+        self._debug_subscribers.discard(websocket)
+        if not self._debug_subscribers:
+            self._sync_debug_callback()
+
     @property
     def debug_subscriber_count(self) -> int:
         """获取调试订阅者数量"""
@@ -1,5 +1,7 @@
 """布局数据结构测试"""
 
+from dataclasses import asdict
+
 from termsupervisor.adapters import JobMetadata, TerminalAdapter
 from termsupervisor.adapters.iterm2.models import LayoutData, PaneInfo, TabInfo, WindowInfo
 
@@ -83,3 +85,17 @@ class TestLayoutDataClasses:
         layout = LayoutData(windows=[], active_pane_id=None)
         assert layout.windows == []
         assert layout.active_pane_id is None
+
+    def test_layout_data_to_dict_matches_asdict(self):
+        """LayoutData.to_dict 与 dataclasses.asdict 结果一致，且不共享列表"""
+        pane = PaneInfo(pane_id="p1", name="zsh", index=0, x=0, y=0, width=100, height=50)
+        tab = TabInfo(tab_id="tab-1", name="Tab 1", panes=[pane])
+        window = WindowInfo(
+            window_id="w1", name="Window 1", x=0, y=0, width=800, height=600, tabs=[tab]
+        )
+        layout = LayoutData(windows=[window], updated_panes=["p1"], active_pane_id="p1")
+
+        data = layout.to_dict()
+
+        assert data == asdict(layout)
+        assert data["updated_panes"] is not layout.updated_panes
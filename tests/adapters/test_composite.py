@@ -1,10 +1,10 @@
 """Tests for CompositeAdapter."""
 
 import pytest
-from unittest.mock import AsyncMock, MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock
 
 from termsupervisor.adapters.base import JobMetadata
-from termsupervisor.adapters.composite import CompositeAdapter, TmuxMapping
+from termsupervisor.adapters.composite import CompositeAdapter
 from termsupervisor.adapters.iterm2.models import (
     LayoutData,
     PaneInfo,
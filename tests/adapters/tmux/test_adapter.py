@@ -1,11 +1,11 @@
 """Tests for TmuxAdapter."""
 
-from unittest.mock import AsyncMock, MagicMock, patch
+from unittest.mock import patch
 
 import pytest
 
 from termsupervisor.adapters import JobMetadata, TerminalAdapter
-from termsupervisor.adapters.iterm2.models import LayoutData, PaneInfo, TabInfo, WindowInfo
+from termsupervisor.adapters.iterm2.models import LayoutData
 from termsupervisor.adapters.tmux.adapter import TmuxAdapter
 
 
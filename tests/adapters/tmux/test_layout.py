@@ -1,7 +1,5 @@
 """Tests for tmux layout parser."""
 
-import pytest
-
 from termsupervisor.adapters.iterm2.models import LayoutData, PaneInfo, TabInfo, WindowInfo
 from termsupervisor.adapters.tmux.layout import TmuxLayoutBuilder
 
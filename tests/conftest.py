@@ -2,8 +2,22 @@
 
 import pytest
 
+from termsupervisor.telemetry import metrics
+
 
 @pytest.fixture
 def anyio_backend():
     """指定 anyio 只使用 asyncio backend"""
     return "asyncio"
+
+
+@pytest.fixture
+def reset_metrics():
+    """测试结束后只回滚本测试写入的指标
+
+    开销与本测试的写入量成正比；需要的模块通过
+    pytestmark = pytest.mark.usefixtures("reset_metrics") 启用。
+    """
+    with metrics.scoped() as scope:
+        yield
+        scope.rollback()
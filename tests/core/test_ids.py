@@ -1,7 +1,5 @@
 """Tests for core.ids - terminal-agnostic ID utilities"""
 
-import pytest
-
 from termsupervisor.core.ids import normalize_id, id_match
 
 
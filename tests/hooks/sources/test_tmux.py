@@ -82,13 +82,15 @@ class TestTmuxHookSource:
         manager = self._create_mock_manager()
         client = self._create_mock_client()
         source = TmuxHookSource(manager, client=client, poll_interval=0.05)
+        emitted = asyncio.Event()
+        manager.emit_event.side_effect = lambda **kwargs: emitted.set()
 
         # Patch debounce time to be very short for testing
         with patch("termsupervisor.hooks.sources.tmux.FOCUS_DEBOUNCE_SECONDS", 0.05):
             await source.start()
 
             # Wait for poll + debounce
-            await asyncio.sleep(0.15)
+            await asyncio.wait_for(emitted.wait(), timeout=1.0)
 
             # Should have emitted focus event
             manager.emit_event.assert_called_with(
@@ -108,6 +110,13 @@ class TestTmuxHookSource:
         manager = self._create_mock_manager()
         client = self._create_mock_client()
         source = TmuxHookSource(manager, client=client, poll_interval=0.02)
+        emitted_second = asyncio.Event()
+
+        def on_emit(**kwargs):
+            if kwargs["pane_id"] == "%1":
+                emitted_second.set()
+
+        manager.emit_event.side_effect = on_emit
 
         with patch("termsupervisor.hooks.sources.tmux.FOCUS_DEBOUNCE_SECONDS", 0.1):
             await source.start()
@@ -115,14 +124,11 @@ class TestTmuxHookSource:
             # Wait a bit for first detection
             await asyncio.sleep(0.05)
 
-            # Change focus quickly
+            # Change focus quickly, before the first debounce completes
             client.get_active_pane.return_value = "%1"
 
-            # Wait for second detection but before first debounce completes
-            await asyncio.sleep(0.05)
-
-            # Now wait for second debounce to complete
-            await asyncio.sleep(0.15)
+            # Wait for second debounce to complete
+            await asyncio.wait_for(emitted_second.wait(), timeout=1.0)
 
             # Should only have emitted for %1, not %0
             calls = manager.emit_event.call_args_list
@@ -1,9 +1,5 @@
 """Tests for render/cache.py"""
 
-from datetime import datetime
-
-import pytest
-
 from termsupervisor.render.cache import LayoutCache
 from termsupervisor.adapters.iterm2.models import (
     LayoutData,
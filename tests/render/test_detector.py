@@ -3,8 +3,6 @@
 from datetime import datetime, timedelta
 from unittest.mock import patch
 
-import pytest
-
 from termsupervisor.render.detector import ChangeDetector
 
 
@@ -47,6 +45,27 @@ class TestChangeDetector:
         result = detector.should_refresh("pane-1", "hello world")
         assert result is False
 
+    def test_should_refresh_no_change_skips_diff(self):
+        """Test identical content short-circuits before diffing."""
+        detector = ChangeDetector()
+        detector.mark_rendered("pane-1", "hello world")
+
+        with patch("termsupervisor.render.detector.ContentCleaner.diff_lines") as mock_diff:
+            assert detector.should_refresh("pane-1", "hello world") is False
+
+        mock_diff.assert_not_called()
+
+    def test_should_refresh_reads_clock_only_for_timeout_fallback(self):
+        """Test the clock is not read when content is unchanged or changes exceed the threshold."""
+        detector = ChangeDetector(refresh_lines=1)
+        detector.mark_rendered("pane-1", "hello world")
+
+        with patch("termsupervisor.render.detector.datetime") as mock_datetime:
+            assert detector.should_refresh("pane-1", "hello world") is False
+            assert detector.should_refresh("pane-1", "goodbye") is True
+
+        mock_datetime.now.assert_not_called()
+
     def test_should_refresh_small_change(self):
         """Test no refresh for small changes below threshold."""
         detector = ChangeDetector(refresh_lines=5)
@@ -166,6 +166,46 @@ class TestRenderPipeline:
                     # Should not be in updated_panes since content hasn't changed
                     assert "pane-1" not in update.updated_panes
 
+    @pytest.mark.asyncio
+    async def test_tick_reuses_cleaned_content_when_unchanged(self):
+        """Test unchanged raw content is not cleaned again."""
+        mock_adapter = self._create_mock_adapter()
+        pipeline = RenderPipeline(mock_adapter)
+
+        pane = PaneInfo(pane_id="pane-1", name="zsh", index=0, x=0, y=0, width=100, height=50)
+        tab = TabInfo(tab_id="tab-1", name="Tab1", panes=[pane])
+        window = WindowInfo(window_id="win-1", name="Window1", x=0, y=0, width=800, height=600, tabs=[tab])
+        layout = LayoutData(windows=[window])
+
+        with (
+            patch.object(
+                pipeline._poller, "poll_layout", new_callable=AsyncMock, return_value=layout
+            ),
+            patch.object(
+                pipeline._poller,
+                "get_pane_content",
+                new_callable=AsyncMock,
+                return_value="hello world",
+            ),
+            patch.object(
+                pipeline._poller, "get_job_metadata", new_callable=AsyncMock, return_value=None
+            ),
+            patch(
+                "termsupervisor.render.pipeline.ContentCleaner.clean_content_str",
+                return_value="helloworld",
+            ) as mock_clean,
+            patch(
+                "termsupervisor.render.pipeline.ContentCleaner.content_hash",
+                return_value="hash",
+            ) as mock_hash,
+        ):
+            await pipeline.tick()
+            await pipeline.tick()
+
+        assert mock_clean.call_count == 1
+        assert mock_hash.call_count == 1
+        assert pipeline.cache.get_pane_state("pane-1").current.cleaned_content == "helloworld"
+
     @pytest.mark.asyncio
     async def test_tick_with_status_provider_waiting(self):
         """Test tick derives is_waiting from status_provider."""
@@ -2,8 +2,6 @@
 
 from datetime import datetime
 
-import pytest
-
 from termsupervisor.render.types import ContentSnapshot, PaneState, LayoutUpdate
 from termsupervisor.adapters.iterm2.models import LayoutData
 
@@ -106,6 +106,12 @@ class TestCleanLine:
         assert ContentCleaner.clean_line("   ") == ""
         assert ContentCleaner.clean_line("---") == ""
 
+    def test_divider_and_ansi_only_lines(self):
+        """分隔线和纯 ANSI 行"""
+        assert ContentCleaner.clean_line("═══ ─── ···") == ""
+        assert ContentCleaner.clean_line("\x1b[0m\x1b[32m") == ""
+        assert ContentCleaner.clean_line("\x1b[0m ok") == "ok"
+
 
 class TestCleanContent:
     """测试整体内容清洗"""
@@ -1,24 +1,38 @@
 """HookManager 测试"""
 
+import asyncio
+import sys
+
 import pytest
 
 from termsupervisor.hooks.manager import HookManager
+from termsupervisor.hooks.sources.claude_code import normalize_claude_event_type
+from termsupervisor.hooks.sources.shell import sanitize_command
 from termsupervisor.state import TaskStatus
 from termsupervisor.telemetry import metrics
 
+# hooks.events_total 的标签 key（按标签名排序）
+SHELL_START_LABELS = (("event_type", "command_start"), ("source", "shell"))
+SHELL_END_LABELS = (("event_type", "command_end"), ("source", "shell"))
+CLAUDE_SESSION_START_LABELS = (("event_type", "SessionStart"), ("source", "claude-code"))
+ITERM_FOCUS_LABELS = (("event_type", "focus"), ("source", "iterm"))
+FRONTEND_CLICK_LABELS = (("event_type", "click_pane"), ("source", "frontend"))
+
+# 测试结束后回滚本测试写入的指标（fixture 定义见 conftest.py）
+pytestmark = pytest.mark.usefixtures("reset_metrics")
+
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def manager():
-    """创建测试用 HookManager"""
+    """创建测试用 HookManager（模块内共享）"""
     return HookManager()
 
 
 @pytest.fixture(autouse=True)
-def reset_metrics():
-    """每次测试前重置指标"""
-    metrics.reset()
-    yield
-    metrics.reset()
+def _reset_manager(manager):
+    """每次测试前清空共享 HookManager 的 pane 状态和回调"""
+    manager.clear_all()
+    manager.set_change_callback(None)
 
 
 class TestShellEvents:
@@ -170,8 +184,10 @@ class TestStateQuery:
 
     async def test_get_all_panes(self, manager):
         """获取所有 pane"""
-        await manager.process_shell_command_start("pane-1", "ls")
-        await manager.process_shell_command_start("pane-2", "pwd")
+        await asyncio.gather(
+            manager.process_shell_command_start("pane-1", "ls"),
+            manager.process_shell_command_start("pane-2", "pwd"),
+        )
 
         panes = manager.get_all_panes()
         assert "pane-1" in panes
@@ -179,8 +195,10 @@ class TestStateQuery:
 
     async def test_get_all_states(self, manager):
         """获取所有状态"""
-        await manager.process_shell_command_start("pane-1", "ls")
-        await manager.process_claude_code_event("pane-2", "PreToolUse")
+        await asyncio.gather(
+            manager.process_shell_command_start("pane-1", "ls"),
+            manager.process_claude_code_event("pane-2", "PreToolUse"),
+        )
 
         states = manager.get_all_states()
         assert "pane-1" in states
@@ -217,17 +235,21 @@ class TestCleanup:
 
     async def test_clear_all(self, manager):
         """清除所有状态"""
-        await manager.process_shell_command_start("pane-1", "ls")
-        await manager.process_shell_command_start("pane-2", "pwd")
+        await asyncio.gather(
+            manager.process_shell_command_start("pane-1", "ls"),
+            manager.process_shell_command_start("pane-2", "pwd"),
+        )
 
         manager.clear_all()
         assert len(manager.get_all_panes()) == 0
 
     async def test_cleanup_closed_panes(self, manager):
         """清理已关闭的 pane"""
-        await manager.process_shell_command_start("pane-1", "ls")
-        await manager.process_shell_command_start("pane-2", "pwd")
-        await manager.process_shell_command_start("pane-3", "cd")
+        await asyncio.gather(
+            manager.process_shell_command_start("pane-1", "ls"),
+            manager.process_shell_command_start("pane-2", "pwd"),
+            manager.process_shell_command_start("pane-3", "cd"),
+        )
 
         # pane-2 关闭了
         closed = manager.cleanup_closed_panes({"pane-1", "pane-3"})
@@ -264,6 +286,17 @@ class TestEmitEvent:
         )
         assert count >= 1
 
+    async def test_emit_event_interns_signal(self, manager):
+        """emit_event 写入历史的 signal 是驻留字符串"""
+        await manager.emit_event(
+            source="shell",
+            pane_id="test-pane",
+            event_type="command_start",
+            data={"command": "ls"},
+        )
+        history = manager.get_history("test-pane")
+        assert history[-1].signal is sys.intern("shell.command_start")
+
     async def test_emit_event_no_log(self, manager):
         """emit_event log=False 不记录日志"""
         # 这主要验证不抛异常，日志禁用由 log=False 控制
@@ -291,77 +324,55 @@ class TestEmitEvent:
 
     async def test_process_methods_delegate_to_emit_event(self, manager):
         """process_* 方法委托给 emit_event"""
+
         # 验证指标累加证明确实走了 emit_event
-        await manager.process_shell_command_start("pane-1", "ls")
-        await manager.process_shell_command_end("pane-1", 0)
-        await manager.process_claude_code_event("pane-2", "SessionStart")
-        await manager.process_user_focus("pane-3")
-        await manager.process_user_click("pane-4")
+        # pane-1 的 start → end 需要保持顺序，其余 pane 互相独立
+        async def shell_sequence():
+            await manager.process_shell_command_start("pane-1", "ls")
+            await manager.process_shell_command_end("pane-1", 0)
+
+        await asyncio.gather(
+            shell_sequence(),
+            manager.process_claude_code_event("pane-2", "SessionStart"),
+            manager.process_user_focus("pane-3"),
+            manager.process_user_click("pane-4"),
+        )
 
         # 检查指标被记录
-        shell_start = metrics.get_counter(
-            "hooks.events_total",
-            labels={"source": "shell", "event_type": "command_start"},
-        )
-        shell_end = metrics.get_counter(
-            "hooks.events_total",
-            labels={"source": "shell", "event_type": "command_end"},
-        )
-        claude = metrics.get_counter(
-            "hooks.events_total",
-            labels={"source": "claude-code", "event_type": "SessionStart"},
-        )
-        iterm = metrics.get_counter(
-            "hooks.events_total",
-            labels={"source": "iterm", "event_type": "focus"},
-        )
-        frontend = metrics.get_counter(
-            "hooks.events_total",
-            labels={"source": "frontend", "event_type": "click_pane"},
-        )
+        snap = metrics.snapshot("hooks.events_total")
 
-        assert shell_start >= 1
-        assert shell_end >= 1
-        assert claude >= 1
-        assert iterm >= 1
-        assert frontend >= 1
+        assert snap.get(SHELL_START_LABELS, 0) >= 1
+        assert snap.get(SHELL_END_LABELS, 0) >= 1
+        assert snap.get(CLAUDE_SESSION_START_LABELS, 0) >= 1
+        assert snap.get(ITERM_FOCUS_LABELS, 0) >= 1
+        assert snap.get(FRONTEND_CLICK_LABELS, 0) >= 1
 
 
 class TestSanitization:
     """命令清洗测试"""
 
-    def test_sanitize_command_basic(self):
-        """基本清洗"""
-        from termsupervisor.hooks.sources.shell import sanitize_command
-
-        assert sanitize_command("ls -la") == "ls -la"
-        assert sanitize_command("") == ""
-
-    def test_sanitize_command_removes_nul(self):
-        """移除 NUL 字符"""
-        from termsupervisor.hooks.sources.shell import sanitize_command
-
-        # NUL 字符被直接移除（不替换为空格）
-        assert sanitize_command("ls\x00la") == "lsla"
-        assert sanitize_command("a\x00b\x00c") == "abc"
-
-    def test_sanitize_command_replaces_newlines(self):
-        """换行替换为空格"""
-        from termsupervisor.hooks.sources.shell import sanitize_command
-
-        assert sanitize_command("line1\nline2") == "line1 line2"
-        assert sanitize_command("line1\r\nline2") == "line1 line2"
-
-    def test_sanitize_command_collapses_whitespace(self):
-        """折叠连续空白"""
-        from termsupervisor.hooks.sources.shell import sanitize_command
-
-        assert sanitize_command("ls   -la    foo") == "ls -la foo"
+    @pytest.mark.parametrize(
+        ("command", "expected"),
+        [
+            # 基本清洗
+            ("ls -la", "ls -la"),
+            ("", ""),
+            # NUL 字符被直接移除（不替换为空格）
+            ("ls\x00la", "lsla"),
+            ("a\x00b\x00c", "abc"),
+            # 换行替换为空格
+            ("line1\nline2", "line1 line2"),
+            ("line1\r\nline2", "line1 line2"),
+            # 折叠连续空白
+            ("ls   -la    foo", "ls -la foo"),
+        ],
+    )
+    def test_sanitize_command(self, command, expected):
+        """清洗规则"""
+        assert sanitize_command(command) == expected
 
     def test_sanitize_command_truncates(self):
         """截断长命令"""
-        from termsupervisor.hooks.sources.shell import sanitize_command
-
         long_cmd = "a" * 200
         result = sanitize_command(long_cmd, max_len=50)
         assert len(result) == 50
@@ -371,20 +382,20 @@ class TestSanitization:
 class TestClaudeEventNormalization:
     """Claude 事件类型规范化测试"""
 
-    def test_normalize_claude_event_type(self):
+    @pytest.mark.parametrize(
+        ("event_type", "expected"),
+        [
+            ("stop", "Stop"),
+            ("STOP", "Stop"),
+            ("pre_tool", "PreToolUse"),
+            ("pre_tool_use", "PreToolUse"),
+            ("session_start", "SessionStart"),
+            ("permission_prompt", "Notification:permission_prompt"),
+            # 未知事件类型直接透传
+            ("CustomEvent", "CustomEvent"),
+            ("UnknownEvent", "UnknownEvent"),
+        ],
+    )
+    def test_normalize_claude_event_type(self, event_type, expected):
         """规范化 Claude 事件类型"""
-        from termsupervisor.hooks.sources.claude_code import normalize_claude_event_type
-
-        assert normalize_claude_event_type("stop") == "Stop"
-        assert normalize_claude_event_type("STOP") == "Stop"
-        assert normalize_claude_event_type("pre_tool") == "PreToolUse"
-        assert normalize_claude_event_type("pre_tool_use") == "PreToolUse"
-        assert normalize_claude_event_type("session_start") == "SessionStart"
-        assert normalize_claude_event_type("permission_prompt") == "Notification:permission_prompt"
-
-    def test_normalize_claude_event_type_passthrough(self):
-        """未知事件类型直接透传"""
-        from termsupervisor.hooks.sources.claude_code import normalize_claude_event_type
-
-        assert normalize_claude_event_type("CustomEvent") == "CustomEvent"
-        assert normalize_claude_event_type("UnknownEvent") == "UnknownEvent"
+        assert normalize_claude_event_type(event_type) == expected
@@ -48,14 +48,16 @@ def test_layout_data():
     assert data["updated_panes"] == ["s1"]
 
 
+class _StubAdapter:
+    """RenderPipeline 构造时不会调用 adapter，轻量桩即可"""
+
+    name = "stub"
+
+
 def test_render_pipeline_import():
     """测试 RenderPipeline 导入"""
-    from unittest.mock import MagicMock
-
     from termsupervisor.render import RenderPipeline
 
-    mock_adapter = MagicMock()
-    mock_adapter.name = "mock"
-    pipeline = RenderPipeline(adapter=mock_adapter)
+    pipeline = RenderPipeline(adapter=_StubAdapter())
     assert pipeline._running is False
     assert pipeline._callbacks == []
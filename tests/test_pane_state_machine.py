@@ -1,28 +1,64 @@
-"""PaneStateMachine 测试"""
+"""PaneStateMachine 与 TaskStatus 测试"""
+
+import dataclasses
+import sys
+import time
 
 import pytest
 
+from termsupervisor.config import STATE_HISTORY_MAX_LENGTH
 from termsupervisor.state import (
+    DisplayState,
     HookEvent,
     PaneStateMachine,
     StateChange,
     TaskStatus,
+    TransitionRule,
 )
+from termsupervisor.state.transitions import TRANSITION_RULES, find_matching_rules
 from termsupervisor.telemetry import metrics
 
+pytestmark = pytest.mark.state_machine
 
-@pytest.fixture
-def machine():
-    """创建测试用状态机"""
+
+def ev(source: str, event_type: str, data: dict | None = None, gen: int = 1) -> HookEvent:
+    """构造测试用 HookEvent（pane_id 固定为 test-pane-123）"""
+    return HookEvent(
+        source=source,
+        pane_id="test-pane-123",
+        event_type=event_type,
+        data=data or {},
+        pane_generation=gen,
+    )
+
+
+# 只读的常用事件（状态机不修改事件），模块加载时构造一次，各测试复用
+SESSION_START = ev("claude-code", "SessionStart")
+SHELL_LS_START = ev("shell", "command_start", {"command": "ls"})
+PERMISSION_PROMPT = ev("claude-code", "Notification:permission_prompt")
+SHELL_END_OK = ev("shell", "command_end", {"exit_code": 0})
+CONTENT_CHANGED = ev("content", "changed")
+
+
+@pytest.fixture(scope="module")
+def _machine():
+    """创建测试用状态机（模块内共享）"""
     return PaneStateMachine(pane_id="test-pane-123")
 
 
-@pytest.fixture(autouse=True)
-def reset_metrics():
-    """每次测试前重置指标"""
-    metrics.reset()
-    yield
-    metrics.reset()
+@pytest.fixture
+def machine(_machine):
+    """每次测试前把共享状态机恢复为初始状态"""
+    _machine.reset()
+    return _machine
+
+
+@pytest.fixture(autouse=True, scope="module")
+def _disable_metrics():
+    """本模块不断言指标，关闭状态机的指标收集"""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr("termsupervisor.state.state_machine.METRICS_ENABLED", False)
+        yield
 
 
 class TestShellTransitions:
@@ -30,13 +66,7 @@ class TestShellTransitions:
 
     def test_command_start_from_idle(self, machine):
         """S1: IDLE → RUNNING (shell.command_start)"""
-        event = HookEvent(
-            source="shell",
-            pane_id="test-pane-123",
-            event_type="command_start",
-            data={"command": "ls -la"},
-            pane_generation=1,
-        )
+        event = ev("shell", "command_start", {"command": "ls -la"})
 
         result = machine.process(event)
 
@@ -48,83 +78,36 @@ class TestShellTransitions:
         assert machine.description == "执行: ls -la"
         assert machine.started_at is not None
 
-    def test_command_end_success(self, machine):
-        """S2: RUNNING → DONE (exit_code=0)"""
+    @pytest.mark.parametrize(
+        ("exit_code", "expected_status", "expected_description"),
+        [
+            (0, TaskStatus.DONE, "命令完成"),  # S2
+            (1, TaskStatus.FAILED, "失败 (exit=1)"),  # S3
+        ],
+    )
+    def test_command_end(self, machine, exit_code, expected_status, expected_description):
+        """S2/S3: RUNNING → DONE (exit_code=0) / FAILED (exit_code≠0)"""
         # 先执行命令
-        machine.process(
-            HookEvent(
-                source="shell",
-                pane_id="test-pane-123",
-                event_type="command_start",
-                data={"command": "ls"},
-                pane_generation=1,
-            )
-        )
+        machine.process(SHELL_LS_START)
 
-        # 命令成功结束
-        event = HookEvent(
-            source="shell",
-            pane_id="test-pane-123",
-            event_type="command_end",
-            data={"exit_code": 0},
-            pane_generation=1,
-        )
+        # 命令结束
+        event = ev("shell", "command_end", {"exit_code": exit_code})
 
         result = machine.process(event)
 
         assert result is not None
-        assert machine.status == TaskStatus.DONE
+        assert machine.status == expected_status
         assert machine.source == "shell"
-
-    def test_command_end_failure(self, machine):
-        """S3: RUNNING → FAILED (exit_code≠0)"""
-        machine.process(
-            HookEvent(
-                source="shell",
-                pane_id="test-pane-123",
-                event_type="command_start",
-                data={"command": "false"},
-                pane_generation=1,
-            )
-        )
-
-        event = HookEvent(
-            source="shell",
-            pane_id="test-pane-123",
-            event_type="command_end",
-            data={"exit_code": 1},
-            pane_generation=1,
-        )
-
-        result = machine.process(event)
-
-        assert result is not None
-        assert machine.status == TaskStatus.FAILED
-        assert "exit=1" in machine.description
+        assert machine.description == expected_description
 
     def test_command_end_ignored_when_not_shell_source(self, machine):
         """shell.command_end 只处理 shell source 的 RUNNING"""
         # Claude 发起的 RUNNING
-        machine.process(
-            HookEvent(
-                source="claude-code",
-                pane_id="test-pane-123",
-                event_type="SessionStart",
-                pane_generation=1,
-            )
-        )
+        machine.process(SESSION_START)
         assert machine.source == "claude-code"
 
         # shell.command_end 应该被忽略
-        event = HookEvent(
-            source="shell",
-            pane_id="test-pane-123",
-            event_type="command_end",
-            data={"exit_code": 0},
-            pane_generation=1,
-        )
-
-        result = machine.process(event)
+        result = machine.process(SHELL_END_OK)
 
         assert result is None
         assert machine.status == TaskStatus.RUNNING  # 状态未变
@@ -135,12 +118,7 @@ class TestClaudeCodeTransitions:
 
     def test_session_start(self, machine):
         """C1: * → RUNNING (SessionStart)"""
-        event = HookEvent(
-            source="claude-code",
-            pane_id="test-pane-123",
-            event_type="SessionStart",
-            pane_generation=1,
-        )
+        event = SESSION_START
 
         result = machine.process(event)
 
@@ -150,13 +128,7 @@ class TestClaudeCodeTransitions:
 
     def test_pre_tool_use(self, machine):
         """C2: * → RUNNING (PreToolUse)"""
-        event = HookEvent(
-            source="claude-code",
-            pane_id="test-pane-123",
-            event_type="PreToolUse",
-            data={"tool_name": "Read"},
-            pane_generation=1,
-        )
+        event = ev("claude-code", "PreToolUse", {"tool_name": "Read"})
 
         result = machine.process(event)
 
@@ -164,184 +136,88 @@ class TestClaudeCodeTransitions:
         assert machine.status == TaskStatus.RUNNING
         assert "Read" in machine.description
 
-    def test_pre_tool_use_same_source_no_reset_started_at(self, machine):
+    def test_pre_tool_use_same_source_no_reset_started_at(self):
         """C2: PreToolUse 同源时不重置 started_at"""
-        # 第一个工具
-        machine.process(
-            HookEvent(
-                source="claude-code",
-                pane_id="test-pane-123",
-                event_type="PreToolUse",
-                data={"tool_name": "Read"},
-                pane_generation=1,
-            )
-        )
-        first_started_at = machine.started_at
+        now = [1000.0]
+        machine = PaneStateMachine(pane_id="test-pane-123", clock=lambda: now[0])
 
-        # 等一小段时间
-        import time
+        # 第一个工具
+        machine.process(ev("claude-code", "PreToolUse", {"tool_name": "Read"}))
+        assert machine.started_at == 1000.0
 
-        time.sleep(0.01)
+        # 时钟前进（无需真实等待）
+        now[0] = 1000.5
 
         # 第二个工具
-        machine.process(
-            HookEvent(
-                source="claude-code",
-                pane_id="test-pane-123",
-                event_type="PreToolUse",
-                data={"tool_name": "Write"},
-                pane_generation=1,
-            )
-        )
+        machine.process(ev("claude-code", "PreToolUse", {"tool_name": "Write"}))
 
         # started_at 应该保持不变
-        assert machine.started_at == first_started_at
-
-    def test_stop(self, machine):
-        """C3: RUNNING → DONE (Stop)"""
-        machine.process(
-            HookEvent(
-                source="claude-code",
-                pane_id="test-pane-123",
-                event_type="SessionStart",
-                pane_generation=1,
-            )
-        )
-
-        event = HookEvent(
-            source="claude-code",
-            pane_id="test-pane-123",
-            event_type="Stop",
-            pane_generation=1,
-        )
-
-        result = machine.process(event)
-
-        assert result is not None
-        assert machine.status == TaskStatus.DONE
+        assert machine.started_at == 1000.0
 
     def test_permission_prompt(self, machine):
         """C4: * → WAITING_APPROVAL"""
-        event = HookEvent(
-            source="claude-code",
-            pane_id="test-pane-123",
-            event_type="Notification:permission_prompt",
-            pane_generation=1,
-        )
+        event = PERMISSION_PROMPT
 
         result = machine.process(event)
 
         assert result is not None
         assert machine.status == TaskStatus.WAITING_APPROVAL
 
-    def test_idle_prompt(self, machine):
-        """C5: * → IDLE"""
-        machine.process(
-            HookEvent(
-                source="claude-code",
-                pane_id="test-pane-123",
-                event_type="SessionStart",
-                pane_generation=1,
-            )
-        )
+    @pytest.mark.parametrize(
+        ("event_type", "expected_status"),
+        [
+            ("Stop", TaskStatus.DONE),  # C3
+            ("Notification:idle_prompt", TaskStatus.IDLE),  # C5
+            ("SessionEnd", TaskStatus.IDLE),  # C6
+        ],
+    )
+    def test_from_running(self, machine, event_type, expected_status):
+        """C3/C5/C6: 会话运行中收到 Stop / idle_prompt / SessionEnd"""
+        machine.process(SESSION_START)
 
-        event = HookEvent(
-            source="claude-code",
-            pane_id="test-pane-123",
-            event_type="Notification:idle_prompt",
-            pane_generation=1,
-        )
-
-        result = machine.process(event)
+        result = machine.process(ev("claude-code", event_type))
 
         assert result is not None
-        assert machine.status == TaskStatus.IDLE
-
-    def test_session_end(self, machine):
-        """C6: * → IDLE"""
-        machine.process(
-            HookEvent(
-                source="claude-code",
-                pane_id="test-pane-123",
-                event_type="SessionStart",
-                pane_generation=1,
-            )
-        )
-
-        event = HookEvent(
-            source="claude-code",
-            pane_id="test-pane-123",
-            event_type="SessionEnd",
-            pane_generation=1,
-        )
-
-        result = machine.process(event)
-
-        assert result is not None
-        assert machine.status == TaskStatus.IDLE
+        assert machine.status == expected_status
+        assert machine.source == "claude-code"
 
 
 class TestUserTransitions:
     """用户操作流转测试"""
 
-    def test_user_clear_waiting_focus(self, machine):
-        """U1: WAITING → IDLE (iterm.focus)"""
-        machine.process(
-            HookEvent(
-                source="claude-code",
-                pane_id="test-pane-123",
-                event_type="Notification:permission_prompt",
-                pane_generation=1,
-            )
-        )
-
-        event = HookEvent(
-            source="iterm",
-            pane_id="test-pane-123",
-            event_type="focus",
-            pane_generation=1,
-        )
+    @pytest.mark.parametrize(
+        ("source", "event_type"),
+        [("iterm", "focus"), ("tmux", "focus"), ("frontend", "click_pane")],
+    )
+    def test_user_clear_waiting(self, machine, source, event_type):
+        """U1: WAITING → IDLE (iterm.focus / tmux.focus / frontend.click_pane)"""
+        machine.process(PERMISSION_PROMPT)
 
-        result = machine.process(event)
+        result = machine.process(ev(source, event_type))
 
         assert result is not None
         assert machine.status == TaskStatus.IDLE
         assert machine.source == "user"
 
-    def test_user_clear_done_click(self, machine):
-        """U2: DONE → IDLE (frontend.click_pane)"""
-        # 进入 DONE 状态
-        machine.process(
-            HookEvent(
-                source="shell",
-                pane_id="test-pane-123",
-                event_type="command_start",
-                data={"command": "ls"},
-                pane_generation=1,
-            )
-        )
-        machine.process(
-            HookEvent(
-                source="shell",
-                pane_id="test-pane-123",
-                event_type="command_end",
-                data={"exit_code": 0},
-                pane_generation=1,
-            )
-        )
-        assert machine.status == TaskStatus.DONE
+    @pytest.mark.parametrize("exit_code", [0, 1])  # DONE / FAILED
+    @pytest.mark.parametrize(
+        ("source", "event_type"),
+        [("iterm", "focus"), ("tmux", "focus"), ("frontend", "click_pane")],
+    )
+    def test_user_clear_finished(self, machine, exit_code, source, event_type):
+        """U2: DONE/FAILED → IDLE (iterm.focus / tmux.focus / frontend.click_pane)"""
+        # 进入 DONE / FAILED 状态
+        machine.process(SHELL_LS_START)
+        machine.process(ev("shell", "command_end", {"exit_code": exit_code}))
+        assert machine.status in (TaskStatus.DONE, TaskStatus.FAILED)
 
-        event = HookEvent(
-            source="frontend",
-            pane_id="test-pane-123",
-            event_type="click_pane",
-            pane_generation=1,
-        )
+        event = ev(source, event_type)
 
         result = machine.process(event)
 
         assert result is not None
         assert machine.status == TaskStatus.IDLE
+        assert machine.source == "user"
 
 
 class TestContentTransitions:
@@ -350,12 +226,7 @@ class TestContentTransitions:
     def test_content_update_from_other_states_ignored(self, machine):
         """content.update 只在 WAITING_APPROVAL 时触发"""
         # IDLE 状态
-        event = HookEvent(
-            source="content",
-            pane_id="test-pane-123",
-            event_type="update",
-            pane_generation=1,
-        )
+        event = ev("content", "update")
 
         result = machine.process(event)
 
@@ -363,6 +234,35 @@ class TestContentTransitions:
         assert machine.status == TaskStatus.IDLE
 
 
+class TestShortId:
+    """short_id 测试"""
+
+    def test_short_id_precomputed(self):
+        """short_id 在构造时计算"""
+        machine = PaneStateMachine(pane_id="iterm2:ABCDEF1234567890")
+        assert machine.short_id == "ABCDEF12"
+
+
+class TestReset:
+    """reset 测试"""
+
+    def test_reset_restores_initial_state(self, machine):
+        """reset 恢复 IDLE、清空历史并分配新的 state_id"""
+        machine.process(SESSION_START)
+        machine.increment_generation()
+        old_state_id = machine.state_id
+
+        machine.reset()
+
+        assert machine.status == TaskStatus.IDLE
+        assert machine.source == "shell"
+        assert machine.description == ""
+        assert machine.started_at is None
+        assert machine.pane_generation == 1
+        assert machine.history == []
+        assert machine.state_id > old_state_id
+
+
 class TestGenerationCheck:
     """Generation 检查测试"""
 
@@ -373,13 +273,7 @@ class TestGenerationCheck:
         assert machine.pane_generation == 2
 
         # 发送旧 generation 的事件
-        event = HookEvent(
-            source="shell",
-            pane_id="test-pane-123",
-            event_type="command_start",
-            data={"command": "ls"},
-            pane_generation=1,  # 旧的
-        )
+        event = ev("shell", "command_start", {"command": "ls"}, gen=1)  # 旧的
 
         result = machine.process(event)
 
@@ -394,15 +288,7 @@ class TestStateId:
         """状态转换时 state_id 递增"""
         initial_id = machine.state_id
 
-        machine.process(
-            HookEvent(
-                source="shell",
-                pane_id="test-pane-123",
-                event_type="command_start",
-                data={"command": "ls"},
-                pane_generation=1,
-            )
-        )
+        machine.process(SHELL_LS_START)
 
         assert machine.state_id > initial_id
 
@@ -411,14 +297,7 @@ class TestStateId:
         initial_id = machine.state_id
 
         # 尝试无效的转换
-        machine.process(
-            HookEvent(
-                source="content",
-                pane_id="test-pane-123",
-                event_type="changed",
-                pane_generation=1,
-            )
-        )
+        machine.process(CONTENT_CHANGED)
 
         assert machine.state_id == initial_id
 
@@ -428,15 +307,7 @@ class TestHistory:
 
     def test_history_records_transitions(self, machine):
         """历史记录包含转换"""
-        machine.process(
-            HookEvent(
-                source="shell",
-                pane_id="test-pane-123",
-                event_type="command_start",
-                data={"command": "ls"},
-                pane_generation=1,
-            )
-        )
+        machine.process(SHELL_LS_START)
 
         history = machine.history
         assert len(history) == 1
@@ -445,15 +316,264 @@ class TestHistory:
 
     def test_history_records_failed_transitions(self, machine):
         """历史记录包含失败的转换"""
-        machine.process(
-            HookEvent(
-                source="content",
-                pane_id="test-pane-123",
-                event_type="changed",
-                pane_generation=1,
-            )
-        )
+        machine.process(CONTENT_CHANGED)
 
         history = machine.history
         assert len(history) == 1
         assert history[0].success is False
+
+    def test_history_capped_at_max_length(self, machine):
+        """历史记录超过上限时丢弃最旧条目（只需多处理一次即可触发）"""
+        # 失败转换同样记入历史，同一只读事件重复使用即可
+        for _ in range(STATE_HISTORY_MAX_LENGTH + 1):
+            machine.process(CONTENT_CHANGED)
+
+        assert len(machine.history) == STATE_HISTORY_MAX_LENGTH
+
+    def test_last_history_entry(self, machine):
+        """last_history_entry 返回最近一条历史，无历史时为 None"""
+        assert machine.last_history_entry is None
+
+        machine.process(SHELL_LS_START)
+        machine.process(CONTENT_CHANGED)
+
+        assert machine.last_history_entry == machine.history[-1]
+        assert machine.last_history_entry.success is False
+
+
+class TestHookEvent:
+    """HookEvent 构造测试"""
+
+    def test_strings_are_interned(self):
+        """source / event_type / signal 在构造时驻留（模拟来自 JSON 的新字符串）"""
+        event = HookEvent(
+            source="".join(["sh", "ell"]),
+            pane_id="test-pane-123",
+            event_type="".join(["command", "_start"]),
+        )
+
+        assert event.source is sys.intern("shell")
+        assert event.event_type is sys.intern("command_start")
+        assert event.signal is sys.intern("shell.command_start")
+
+    def test_unknown_strings_are_not_interned(self):
+        """规则表之外的 event_type / signal 保持原对象，不进入驻留表"""
+        event_type = "".join(["unknown", "_event"])
+        event = HookEvent(source="shell", pane_id="test-pane-123", event_type=event_type)
+
+        assert event.event_type is event_type
+        assert event.signal == "shell.unknown_event"
+        assert event.signal is not sys.intern("shell.unknown_event")
+
+    def test_has_no_instance_dict(self):
+        """HookEvent 使用 __slots__，不创建实例 __dict__"""
+        assert not hasattr(SHELL_LS_START, "__dict__")
+
+
+class TestClock:
+    """注入时钟测试"""
+
+    def test_running_duration_uses_injected_clock(self):
+        """started_at / running_duration 来自注入的时钟"""
+        now = [100.0]
+        machine = PaneStateMachine(pane_id="test-pane-123", clock=lambda: now[0])
+
+        machine.process(ev("shell", "command_start", {"command": "sleep 5"}))
+        assert machine.started_at == 100.0
+
+        now[0] = 105.0
+        assert machine.get_running_duration() == 5.0
+
+        change = machine.process(SHELL_END_OK)
+        assert change is not None
+        assert change.running_duration == 5.0
+
+    def test_running_duration_with_clock_starting_at_zero(self):
+        """started_at 为 0.0 时仍计算运行时长（时钟可从 0 开始）"""
+        now = [0.0]
+        machine = PaneStateMachine(pane_id="test-pane-123", clock=lambda: now[0])
+
+        machine.process(SHELL_LS_START)
+        assert machine.started_at == 0.0
+
+        now[0] = 3.0
+        change = machine.process(SHELL_END_OK)
+        assert change is not None
+        assert change.running_duration == 3.0
+
+    def test_default_clock_is_monotonic(self, machine):
+        """默认时钟为单调时钟"""
+        before = time.monotonic()
+        machine.process(SHELL_LS_START)
+        after = time.monotonic()
+
+        assert before <= machine.started_at <= after
+
+
+class TestStateChange:
+    """StateChange 数据类测试"""
+
+    def test_state_change_is_frozen(self):
+        """StateChange 不可变"""
+        change = StateChange(
+            old_status=TaskStatus.IDLE,
+            new_status=TaskStatus.RUNNING,
+            old_source="shell",
+            new_source="shell",
+            description="执行: ls",
+            state_id=1,
+        )
+
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            change.state_id = 2  # type: ignore[misc]
+        assert not hasattr(change, "__dict__")
+
+
+class TestSlots:
+    """__slots__ 测试"""
+
+    def test_machine_has_no_instance_dict(self, machine):
+        """PaneStateMachine 不创建实例 __dict__"""
+        assert not hasattr(machine, "__dict__")
+        with pytest.raises(AttributeError):
+            machine.unknown_attr = 1  # type: ignore[attr-defined]
+
+    def test_display_state_has_no_instance_dict(self):
+        """DisplayState 不创建实例 __dict__"""
+        display_state = DisplayState(
+            status=TaskStatus.IDLE,
+            source="shell",
+            description="",
+            state_id=0,
+        )
+        assert not hasattr(display_state, "__dict__")
+
+    def test_history_entry_is_slotted_and_frozen(self, machine):
+        """StateHistoryEntry 无实例 __dict__ 且不可修改"""
+        machine.process(SHELL_LS_START)
+        entry = machine.history[0]
+
+        assert not hasattr(entry, "__dict__")
+        with pytest.raises(AttributeError):
+            entry.success = False  # type: ignore[misc]
+
+
+def rule_with(template: str) -> TransitionRule:
+    """构造只关心描述模板的规则"""
+    return TransitionRule(
+        from_status=None,
+        from_source=None,
+        signal_pattern="test.signal",
+        to_status=TaskStatus.RUNNING,
+        to_source="test",
+        description_template=template,
+    )
+
+
+class TestFormatDescription:
+    """描述模板格式化测试"""
+
+    @pytest.mark.parametrize(
+        ("template", "data", "expected"),
+        [
+            ("命令完成", {"exit_code": 0}, "命令完成"),
+            ("", {}, ""),
+            ("失败 (exit={exit_code})", {"exit_code": 2}, "失败 (exit=2)"),
+            ("执行: {command:5}", {"command": "sleep 10"}, "执行: sleep"),
+            ("工具: {tool_name:30}", {}, "工具: {tool_name:30}"),
+            ("{a}-{b}", {"a": "{b}", "b": "x"}, "{b}-x"),
+        ],
+    )
+    def test_format(self, template, data, expected):
+        """占位符替换、按长度截断、缺失 key 保留原样"""
+        assert rule_with(template).format_description(data) == expected
+
+    @pytest.mark.parametrize("template", ["x" * 60, "{command}"])
+    def test_truncates_to_max_length(self, template):
+        """结果超过 max_length 时截断并以 ... 结尾"""
+        result = rule_with(template).format_description({"command": "y" * 60})
+        assert len(result) == 50
+        assert result.endswith("...")
+
+
+class TestFindMatchingRules:
+    """规则索引查找测试"""
+
+    def test_unknown_signal_matches_nothing(self):
+        """未知信号不匹配任何规则"""
+        assert find_matching_rules("shell.unknown", TaskStatus.IDLE, "shell") == []
+
+    def test_rules_keep_priority_order(self):
+        """同一信号的候选规则保持规则表顺序"""
+        rules = find_matching_rules("shell.command_end", TaskStatus.RUNNING, "shell")
+        assert rules == [
+            rule for rule in TRANSITION_RULES if rule.signal_pattern == "shell.command_end"
+        ]
+
+    @pytest.mark.parametrize("status", list(TaskStatus))
+    @pytest.mark.parametrize("source", ["shell", "claude-code", "user"])
+    def test_index_matches_linear_scan(self, status, source):
+        """索引查找结果与逐条扫描规则表一致"""
+        for signal in {rule.signal_pattern for rule in TRANSITION_RULES}:
+            expected = [
+                rule
+                for rule in TRANSITION_RULES
+                if rule.matches_signal(signal)
+                and rule.matches_from_status(status)
+                and rule.matches_from_source(source, signal.split(".")[0])
+            ]
+            assert find_matching_rules(signal, status, source) == expected
+
+    def test_from_status_and_source_filtered(self):
+        """原状态/来源不匹配的规则被过滤"""
+        assert find_matching_rules("shell.command_end", TaskStatus.IDLE, "shell") == []
+        assert find_matching_rules("claude-code.Stop", TaskStatus.RUNNING, "shell") == []
+
+
+class TestMetricsGate:
+    """METRICS_ENABLED 开关测试"""
+
+    @pytest.mark.usefixtures("reset_metrics")
+    def test_transition_metrics_follow_flag(self, machine, monkeypatch):
+        """关闭时不写指标，开启时记录 transition.ok"""
+        labels = {"pane": machine.short_id}
+        before = metrics.get_counter("transition.ok", labels)
+
+        machine.process(SESSION_START)
+        assert metrics.get_counter("transition.ok", labels) == before
+
+        monkeypatch.setattr("termsupervisor.state.state_machine.METRICS_ENABLED", True)
+        machine.process(ev("claude-code", "Stop"))
+        assert metrics.get_counter("transition.ok", labels) == before + 1
+
+
+class TestTaskStatus:
+    """TaskStatus 枚举测试"""
+
+    def test_status_values(self):
+        """测试状态值"""
+        assert TaskStatus.IDLE.value == "idle"
+        assert TaskStatus.RUNNING.value == "running"
+        assert TaskStatus.WAITING_APPROVAL.value == "waiting_approval"
+        assert TaskStatus.DONE.value == "done"
+        assert TaskStatus.FAILED.value == "failed"
+
+    @pytest.mark.parametrize(
+        ("status", "needs_notification", "needs_attention", "is_running", "display", "color"),
+        [
+            (TaskStatus.IDLE, False, False, False, False, "gray"),
+            (TaskStatus.RUNNING, False, False, True, True, "blue"),
+            (TaskStatus.WAITING_APPROVAL, True, True, False, True, "yellow"),
+            (TaskStatus.DONE, True, True, False, True, "green"),
+            (TaskStatus.FAILED, True, True, False, True, "red"),
+        ],
+    )
+    def test_status_properties(
+        self, status, needs_notification, needs_attention, is_running, display, color
+    ):
+        """测试状态属性：通知、关注（闪烁）、运行中（转圈）、前端显示、颜色"""
+        assert status.needs_notification is needs_notification
+        assert status.needs_attention is needs_attention
+        assert status.is_running is is_running
+        assert status.display is display
+        assert status.color == color
@@ -4,27 +4,53 @@ import asyncio
 
 import pytest
 
+from termsupervisor.config import QUIET_COMPLETION_THRESHOLD_SECONDS
 from termsupervisor.state import (
+    DisplayState,
     DisplayUpdate,
     HookEvent,
+    StateChange,
     StateManager,
     TaskStatus,
 )
+from termsupervisor.state.queue import EventQueue
+from termsupervisor.state.types import DisplayStateDict
 from termsupervisor.telemetry import metrics
 
-
-@pytest.fixture
+# 测试结束后回滚本测试写入的指标（fixture 定义见 conftest.py）
+pytestmark = pytest.mark.usefixtures("reset_metrics")
+
+
+def change(
+    state_id: int,
+    old_status: TaskStatus = TaskStatus.IDLE,
+    new_status: TaskStatus = TaskStatus.RUNNING,
+    running_duration: float = 0.0,
+) -> StateChange:
+    """构造测试用 StateChange（来源固定为 shell）"""
+    return StateChange(
+        old_status=old_status,
+        new_status=new_status,
+        old_source="shell",
+        new_source="shell",
+        description="",
+        state_id=state_id,
+        running_duration=running_duration,
+    )
+
+
+@pytest.fixture(scope="module")
 def manager():
-    """创建测试用 StateManager"""
+    """创建测试用 StateManager（模块内共享）"""
     return StateManager()
 
 
 @pytest.fixture(autouse=True)
-def reset_metrics():
-    """每次测试前重置指标"""
-    metrics.reset()
-    yield
-    metrics.reset()
+def _reset_manager(manager):
+    """每次测试前清空共享 StateManager 的 pane 状态和回调"""
+    manager.clear_all()
+    manager.set_on_display_change(None)
+    manager.set_on_debug_event(None)
 
 
 class TestPaneManagement:
@@ -66,6 +92,34 @@ class TestPaneManagement:
         assert "pane-2" in closed
         assert "pane-2" not in manager.get_all_panes()
 
+    def test_cleanup_closed_panes_in_creation_order(self, manager):
+        """按 pane 创建顺序返回被清理的 pane"""
+        for pane_id in ("pane-3", "pane-1", "pane-2"):
+            manager.get_or_create(pane_id)
+
+        assert manager.cleanup_closed_panes([]) == ["pane-3", "pane-1", "pane-2"]
+
+    def test_clear_all(self, manager):
+        """clear_all 移除所有 pane"""
+        manager.get_or_create("pane-1")
+        manager.get_or_create("pane-2")
+
+        manager.clear_all()
+
+        assert manager.get_all_panes() == set()
+        assert manager.get_all_states() == {}
+
+    def test_cleanup_closed_panes_many(self, manager):
+        """大量 pane 时只清理不在活跃集合中的 pane"""
+        pane_ids = [f"pane-{i}" for i in range(1000)]
+        for pane_id in pane_ids:
+            manager.get_or_create(pane_id)
+
+        closed = manager.cleanup_closed_panes(frozenset(pane_ids[1:]))
+
+        assert closed == ["pane-0"]
+        assert len(manager.get_all_panes()) == 999
+
 
 class TestEventProcessing:
     """事件处理测试"""
@@ -108,6 +162,113 @@ class TestEventProcessing:
         assert result is False
 
 
+class TestStaleDisplayUpdate:
+    """显示层过期检查测试"""
+
+    def test_stale_state_id_does_not_replace_display_state(self, manager):
+        """state_id 更旧的 StateChange 不会覆盖显示状态"""
+        manager.get_or_create("test-pane")
+
+        newer = manager._update_display_state("test-pane", change(10))
+        stale = manager._update_display_state("test-pane", change(5))
+
+        assert newer is not None
+        assert stale is None
+        assert manager.get_display_state("test-pane") is newer
+        assert metrics.get_counter("display.stale_dropped", {"pane": "test-pan"}) == 1
+
+    def test_stale_dropped_metric_follows_flag(self, manager, monkeypatch):
+        """关闭 METRICS_ENABLED 时不记录 display.stale_dropped"""
+        monkeypatch.setattr("termsupervisor.state.manager.METRICS_ENABLED", False)
+        manager.get_or_create("test-pane")
+
+        manager._update_display_state("test-pane", change(10))
+        assert manager._update_display_state("test-pane", change(5)) is None
+        assert metrics.get_counter("display.stale_dropped", {"pane": "test-pan"}) == 0
+
+    def test_unknown_pane_is_ignored(self, manager):
+        """未创建的 pane 不会凭空生成显示状态"""
+        assert manager._update_display_state("unknown-pane", change(1)) is None
+        assert manager.get_display_state("unknown-pane") is None
+
+
+class TestDisplayStateInPlace:
+    """DisplayState 原地更新测试"""
+
+    async def test_display_state_updated_in_place(self, manager):
+        """状态变化复用同一个 DisplayState 实例"""
+        _, display_state = manager.get_or_create("test-pane")
+        manager.enqueue(
+            HookEvent(
+                source="shell",
+                pane_id="test-pane",
+                event_type="command_start",
+                data={"command": "ls"},
+            )
+        )
+        d1 = display_state.to_dict()
+
+        _, updates = await manager.process_queued()
+
+        assert updates[0].display_state is display_state
+        assert manager.get_display_state("test-pane") is display_state
+        assert display_state.status == TaskStatus.RUNNING
+        assert display_state.to_dict() is not d1
+        assert display_state.to_dict()["status"] == "running"
+
+
+class TestDebugSnapshot:
+    """调试快照测试"""
+
+    async def test_machine_reports_running_duration(self):
+        """快照给出已运行秒数，而不是单调时钟的 started_at"""
+        now = [100.0]
+        manager = StateManager(clock=lambda: now[0])
+        manager.enqueue(
+            HookEvent(
+                source="shell",
+                pane_id="test-pane",
+                event_type="command_start",
+                data={"command": "ls"},
+            )
+        )
+        await manager.process_queued()
+        now[0] = 112.5
+
+        machine = manager.get_debug_snapshot("test-pane")["machine"]
+
+        assert "started_at" not in machine
+        assert machine["running_duration"] == 12.5
+
+
+class TestQuietCompletion:
+    """静默完成测试"""
+
+    @pytest.mark.parametrize(
+        ("new_status", "running_duration", "expected"),
+        [
+            (TaskStatus.DONE, QUIET_COMPLETION_THRESHOLD_SECONDS - 1, True),
+            (TaskStatus.FAILED, QUIET_COMPLETION_THRESHOLD_SECONDS - 1, True),
+            (TaskStatus.DONE, QUIET_COMPLETION_THRESHOLD_SECONDS + 1, False),
+            (TaskStatus.RUNNING, 0.0, False),
+        ],
+    )
+    def test_quiet_completion(self, manager, new_status, running_duration, expected):
+        """只有短时间完成的任务标记为静默完成"""
+        manager.get_or_create("test-pane")
+        display_state = manager._update_display_state(
+            "test-pane",
+            change(
+                10,
+                old_status=TaskStatus.RUNNING,
+                new_status=new_status,
+                running_duration=running_duration,
+            ),
+        )
+
+        assert display_state.quiet_completion is expected
+
+
 class TestCallbacks:
     """回调测试 (Phase 3.3: 改用返回值)"""
 
@@ -127,6 +288,46 @@ class TestCallbacks:
         assert updates[0].display_state.status == TaskStatus.RUNNING
         assert updates[0].pane_id == "test-pane"
 
+    async def test_debug_event_reports_fail_reason(self, manager):
+        """转换失败时调试回调收到失败原因"""
+        received = []
+        manager.set_on_debug_event(received.append)
+        manager.enqueue(HookEvent(source="claude-code", pane_id="test-pane", event_type="Stop"))
+        await manager.process_queued()
+
+        assert received[-1]["result"] == "fail"
+        assert received[-1]["reason"] == "no_rule_matched"
+
+    async def test_debug_event_reports_remaining_queue_depth(self, manager):
+        """批量处理时调试事件的 queue_depth 为尚未处理的事件数"""
+        received = []
+        manager.set_on_debug_event(received.append)
+        for event_type, data in (
+            ("command_start", {"command": "ls"}),
+            ("command_end", {"exit_code": 0}),
+            ("command_end", {"exit_code": 0}),
+        ):
+            manager.enqueue(
+                HookEvent(source="shell", pane_id="test-pane", event_type=event_type, data=data)
+            )
+        await manager.process_queued()
+
+        assert [e["result"] for e in received] == ["ok", "ok", "fail"]
+        assert [e["queue_depth"] for e in received] == [2, 1, 0]
+
+    async def test_fail_reason_skipped_without_debug_callback(self, manager, monkeypatch):
+        """无调试回调时不查询失败原因"""
+
+        def _unexpected(machine):
+            raise AssertionError("fail reason should not be computed")
+
+        monkeypatch.setattr(manager, "_get_last_fail_reason", _unexpected)
+        manager.enqueue(HookEvent(source="claude-code", pane_id="test-pane", event_type="Stop"))
+        count, updates = await manager.process_queued()
+
+        assert count == 1
+        assert updates == []
+
 
 class TestProcessQueuedReturnValue:
     """process_queued 返回值测试 (Phase 3.2)"""
@@ -194,6 +395,31 @@ class TestProcessQueuedReturnValue:
         pane_ids = {u.pane_id for u in updates}
         assert pane_ids == {"pane-1", "pane-2"}
 
+    async def test_process_queued_coalesces_updates_per_pane(self, manager):
+        """同一 pane 的多次状态变化只返回一个（最新的）DisplayUpdate"""
+        manager.enqueue(
+            HookEvent(
+                source="shell",
+                pane_id="test-pane",
+                event_type="command_start",
+                data={"command": "ls"},
+            )
+        )
+        manager.enqueue(
+            HookEvent(
+                source="shell",
+                pane_id="test-pane",
+                event_type="command_end",
+                data={"exit_code": 0},
+            )
+        )
+
+        count, updates = await manager.process_queued()
+
+        assert count == 2
+        assert len(updates) == 1
+        assert updates[0].display_state.status == TaskStatus.DONE
+
 
 class TestGeneration:
     """Generation 测试"""
@@ -228,14 +454,96 @@ class TestQueueBehavior:
         count, updates = await manager.process_queued()
         assert count == 5
 
+    async def test_events_enqueued_by_callback_are_processed(self, manager):
+        """处理过程中（回调内）新入队的事件在同一次 process_queued 中处理"""
+
+        def enqueue_end_once(event):
+            if event["signal"] == "shell.command_start":
+                manager.enqueue(
+                    HookEvent(
+                        source="shell",
+                        pane_id=event["pane_id"],
+                        event_type="command_end",
+                        data={"exit_code": 0},
+                    )
+                )
+
+        manager.set_on_debug_event(enqueue_end_once)
+        manager.enqueue(
+            HookEvent(
+                source="shell",
+                pane_id="test-pane",
+                event_type="command_start",
+                data={"command": "ls"},
+            )
+        )
+
+        count, updates = await manager.process_queued()
+
+        assert count == 2
+        assert manager.get_status("test-pane") == TaskStatus.DONE
+
+    def test_drain_returns_all_in_order(self):
+        """drain 按入队顺序一次性取出全部事件"""
+        queue = EventQueue("test-pane", max_size=10)
+        events = [
+            HookEvent(
+                source="shell", pane_id="test-pane", event_type="command_start", pane_generation=1
+            )
+            for _ in range(3)
+        ]
+        for event in events:
+            queue.enqueue_event(event)
+
+        assert queue.drain() == events
+        assert queue.is_empty
+        assert queue.drain() == []
+
+    def test_requeue_front_restores_order(self):
+        """requeue_front 把剩余事件放回队首，排在新入队事件之前"""
+        queue = EventQueue("test-pane", max_size=10)
+        first, second, later = (
+            HookEvent(
+                source="shell", pane_id="test-pane", event_type="command_start", pane_generation=1
+            )
+            for _ in range(3)
+        )
+        queue.enqueue_event(later)
+
+        queue.requeue_front([first, second])
+
+        assert queue.drain() == [first, second, later]
+
+    async def test_failure_mid_batch_keeps_remaining_events(self, manager):
+        """处理中途异常时，剩余事件留在队列中，下次继续处理"""
+
+        def fail_once(event):
+            manager.set_on_debug_event(None)
+            raise RuntimeError("debug callback failed")
+
+        manager.set_on_debug_event(fail_once)
+        for event_type, data in (
+            ("command_start", {"command": "ls"}),
+            ("command_end", {"exit_code": 0}),
+        ):
+            manager.enqueue(
+                HookEvent(source="shell", pane_id="test-pane", event_type=event_type, data=data)
+            )
+
+        with pytest.raises(RuntimeError):
+            await manager.process_queued()
+
+        assert manager.get_status("test-pane") == TaskStatus.RUNNING
+        count, _ = await manager.process_queued()
+        assert count == 1
+        assert manager.get_status("test-pane") == TaskStatus.DONE
+
 
 class TestQueueOverflow:
     """队列溢出测试"""
 
     def test_protected_signal_never_dropped(self, manager):
         """受保护信号永不丢弃"""
-        from termsupervisor.state.queue import EventQueue
-
         queue = EventQueue("test-pane", max_size=10)
 
         # 填充到高水位以上
@@ -269,8 +577,6 @@ class TestDisplayUpdate:
 
     def test_display_update_structure(self):
         """DisplayUpdate 基本结构"""
-        from termsupervisor.state import DisplayState
-
         display_state = DisplayState(
             status=TaskStatus.RUNNING,
             source="shell",
@@ -286,11 +592,12 @@ class TestDisplayUpdate:
         assert update.pane_id == "test-pane"
         assert update.display_state.status == TaskStatus.RUNNING
         assert update.reason == "state_change"
+        assert not hasattr(update, "__dict__")
+        with pytest.raises(AttributeError):
+            update.reason = "other"  # type: ignore[misc]
 
     def test_display_update_to_dict(self):
         """DisplayUpdate to_dict 方法"""
-        from termsupervisor.state import DisplayState
-
         display_state = DisplayState(
             status=TaskStatus.FAILED,
             source="shell",
@@ -309,3 +616,151 @@ class TestDisplayUpdate:
         # display_state 也应该被序列化
         assert "display_state" in d
         assert d["display_state"]["status"] == "failed"
+
+    @pytest.mark.parametrize("status", list(TaskStatus))
+    def test_display_state_to_dict_fields(self, status):
+        """DisplayState.to_dict 包含 DisplayStateDict 的全部字段"""
+        display_state = DisplayState(
+            status=status,
+            source="claude-code",
+            description="desc",
+            state_id=7,
+            running_duration=1.5,
+            quiet_completion=True,
+        )
+
+        d = display_state.to_dict()
+        assert d.keys() == DisplayStateDict.__annotations__.keys()
+        assert d["status"] == status.value
+        assert d["status_color"] == status.color
+        assert d["is_running"] is status.is_running
+        assert d["display"] is status.display
+        assert d["source"] == "claude-code"
+        assert d["state_id"] == 7
+        assert d["running_duration"] == 1.5
+        assert d["recently_finished"] is False
+        assert d["quiet_completion"] is True
+
+    def test_display_state_to_dict_cached(self):
+        """DisplayState.to_dict 结果被缓存，字段赋值后重建"""
+        display_state = DisplayState(
+            status=TaskStatus.RUNNING,
+            source="shell",
+            description="执行: ls",
+            state_id=1,
+        )
+
+        d1 = display_state.to_dict()
+        assert display_state.to_dict() is d1
+
+        display_state.description = "执行: pwd"
+        d2 = display_state.to_dict()
+        assert d2 is not d1
+        assert d2["description"] == "执行: pwd"
+
+
+class TestDisplayChangeCallback:
+    """显示变化回调测试"""
+
+    def test_notify_without_callback_is_noop(self, manager):
+        """未设置回调时通知不报错"""
+        _, display_state = manager.get_or_create("test-pane")
+        manager._notify_display_change("test-pane", display_state)
+
+    def test_notify_calls_registered_callback(self, manager):
+        """设置回调后通知会调用回调"""
+        calls = []
+        manager.set_on_display_change(lambda pane_id, state: calls.append((pane_id, state)))
+        _, display_state = manager.get_or_create("test-pane")
+
+        manager._notify_display_change("test-pane", display_state)
+
+        assert calls == [("test-pane", display_state)]
+
+    async def test_callback_follows_returned_updates(self, manager):
+        """默认模式下每个返回的 DisplayUpdate 回调一次"""
+        calls = []
+        manager.set_on_display_change(lambda pane_id, state: calls.append((pane_id, state)))
+
+        manager.enqueue(
+            HookEvent(
+                source="shell",
+                pane_id="test-pane",
+                event_type="command_start",
+                data={"command": "ls"},
+            )
+        )
+        manager.enqueue(
+            HookEvent(
+                source="shell",
+                pane_id="test-pane",
+                event_type="command_end",
+                data={"exit_code": 0},
+            )
+        )
+        _, updates = await manager.process_queued()
+
+        assert calls == [(u.pane_id, u.display_state) for u in updates]
+        assert len(calls) == 1
+        assert calls[0][1].status == TaskStatus.DONE
+
+    async def test_updates_per_event_when_not_coalesced(self):
+        """coalesce_updates=False 时每个状态变化返回一个 DisplayUpdate 并逐个回调"""
+        manager = StateManager(coalesce_updates=False)
+        calls = []
+        manager.set_on_display_change(lambda pane_id, state: calls.append((pane_id, state.status)))
+
+        for event_type, data in (
+            ("command_start", {"command": "ls"}),
+            ("command_end", {"exit_code": 0}),
+        ):
+            manager.enqueue(
+                HookEvent(source="shell", pane_id="pane-1", event_type=event_type, data=data)
+            )
+        _, updates = await manager.process_queued()
+
+        assert len(updates) == 2
+        assert calls == [("pane-1", TaskStatus.RUNNING), ("pane-1", TaskStatus.DONE)]
+
+    async def test_batch_callbacks_coalesce_per_pane(self):
+        """批量模式下同一 tick 内每个 pane 只回调最新状态"""
+        manager = StateManager(batch_callbacks=True)
+        calls = []
+        manager.set_on_display_change(lambda pane_id, state: calls.append((pane_id, state.status)))
+
+        for event_type, data in (
+            ("command_start", {"command": "ls"}),
+            ("command_end", {"exit_code": 0}),
+        ):
+            manager.enqueue(
+                HookEvent(source="shell", pane_id="pane-1", event_type=event_type, data=data)
+            )
+        manager.enqueue(
+            HookEvent(source="claude-code", pane_id="pane-2", event_type="SessionStart")
+        )
+        await manager.process_queued()
+
+        assert calls == []
+        await asyncio.sleep(0)
+        assert calls == [("pane-1", TaskStatus.DONE), ("pane-2", TaskStatus.RUNNING)]
+
+    async def test_removed_pane_not_flushed(self):
+        """批量模式下回调前移除的 pane 不再回调"""
+        manager = StateManager(batch_callbacks=True)
+        calls = []
+        manager.set_on_display_change(lambda pane_id, state: calls.append(pane_id))
+
+        for pane_id in ("pane-1", "pane-2"):
+            manager.enqueue(
+                HookEvent(
+                    source="shell",
+                    pane_id=pane_id,
+                    event_type="command_start",
+                    data={"command": "ls"},
+                )
+            )
+        await manager.process_queued()
+        manager.remove_pane("pane-1")
+
+        await asyncio.sleep(0)
+        assert calls == ["pane-2"]
@@ -0,0 +1,61 @@
+"""Metrics 测试"""
+
+from termsupervisor.telemetry import Metrics
+
+
+class TestSnapshot:
+    """snapshot 批量查询测试"""
+
+    def test_snapshot_groups_by_sorted_labels(self):
+        """按排序后的标签元组返回同名计数器"""
+        m = Metrics()
+        m.inc("hooks.events_total", {"source": "shell", "event_type": "command_start"})
+        m.inc("hooks.events_total", {"source": "shell", "event_type": "command_start"})
+        m.inc("hooks.events_total", {"source": "iterm", "event_type": "focus"})
+        m.inc("queue.dropped", {"pane": "abc"})
+
+        snap = m.snapshot("hooks.events_total")
+
+        assert snap == {
+            (("event_type", "command_start"), ("source", "shell")): 2,
+            (("event_type", "focus"), ("source", "iterm")): 1,
+        }
+
+    def test_snapshot_without_labels(self):
+        """无标签计数器使用空元组"""
+        m = Metrics()
+        m.inc("transition.ok")
+        assert m.snapshot("transition.ok") == {(): 1}
+
+
+class TestScoped:
+    """scoped 作用域回滚测试"""
+
+    def test_rollback_restores_touched_keys_only(self):
+        """rollback 只恢复作用域内写入的 key"""
+        m = Metrics()
+        m.inc("a")
+        m.gauge("g", 1.0)
+
+        with m.scoped() as scope:
+            m.inc("a")
+            m.inc("b", {"pane": "p"})
+            m.gauge("g", 5.0)
+            scope.rollback()
+
+        assert m.get_counter("a") == 1
+        assert m.get_counter("b", {"pane": "p"}) == 0
+        assert m.snapshot("b") == {}
+        assert m.get_gauge("g") == 1.0
+
+    def test_nested_scope_merges_into_outer(self):
+        """内层作用域的写入由外层 rollback 恢复"""
+        m = Metrics()
+
+        with m.scoped() as outer:
+            with m.scoped():
+                m.inc("a")
+            m.inc("a")
+            outer.rollback()
+
+        assert m.get_all_counters() == {}